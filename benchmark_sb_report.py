@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import csv
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+from process_sb_report import PlotScoutAdvancement, SnapshotCache, req_sort_key
+
+# Synthetic ScoutBook Report Builder exports, and timings of each phase across roster sizes.
+#
+# Generated files follow the layout read_data expects (names, DOB, age, current rank, then for
+# each rank the rank status row, version rows and requirement rows with descriptions), so no
+# personal data is needed to measure parse and render throughput.
+
+# Current rank as ScoutBook writes it for each rank in the progression.
+export_rank_names = ('Scout', 'Tenderfoot', '2nd Class', '1st Class', 'Star', 'Life', 'Eagle')
+
+# Version years, oldest first.
+version_years = ('v2016', 'v2019', 'v2022', 'v2024')
+
+first_names = ('ALEX', 'SAM', 'JORDAN', 'TAYLOR', 'CASEY', 'RILEY', 'MORGAN', 'JAMIE', 'DREW', 'AVERY')
+last_names = ('SMITH', 'JOHNSON', 'LEE', 'GARCIA', 'O\'BRIEN', 'VAN DYKE', 'NGUYEN', 'MILLER-JONES', 'DAVIS', 'PATEL')
+
+def rank_requirements():
+    '''Requirements for each rank, from the categories and durations the charts use.'''
+    rank_reqs = dict()
+    for scout_rank in PlotScoutAdvancement.rank_progression:
+        reqs = set(PlotScoutAdvancement.req_min_durations[scout_rank])
+        for req_where in PlotScoutAdvancement.do_req_where.values():
+            reqs.update(x for x in req_where[scout_rank] if re.fullmatch(r'\d+[a-z]?', x))
+        rank_reqs[scout_rank] = sorted(reqs, key=req_sort_key)
+    return rank_reqs
+
+def version_requirements(reqs, version_index, rng):
+    '''Vary the requirements for later versions by splitting or merging a numbered group.'''
+    reqs = list(reqs)
+    for _ in range(version_index):
+        req_numbers = sorted({int(x.rstrip('abcdefgh')) for x in reqs})
+        req_number = str(rng.choice(req_numbers))
+        group = [x for x in reqs if x.rstrip('abcdefgh') == req_number]
+        insert_at = reqs.index(group[0])
+        reqs = [x for x in reqs if x not in group]
+        new_group = [req_number + 'a', req_number + 'b'] if group == [req_number] else [req_number]
+        reqs[insert_at:insert_at] = new_group
+    return reqs
+
+def format_date(date):
+    '''Month/day/two digit year, as in the export.'''
+    return f'{date.month}/{date.day}/{date.year % 100:02d}'
+
+def generate_report(csv_file, scout_count, version_count=2, completion=0.5, aged_out=0.05, report_date=None, seed=0):
+    '''Write a synthetic Report Builder CSV file.'''
+
+    # Set up the roster.
+    rng = random.Random(seed)
+    report_date = report_date or datetime(2024, 4, 29)
+    rank_count = len(PlotScoutAdvancement.rank_progression)
+    scout_names = [f'{rng.choice(first_names)} {rng.choice(last_names)} {index}' for index in range(scout_count)]
+    ages = [18 if rng.random() < aged_out else rng.randint(11, 17) for _ in scout_names]
+    dobs = [report_date - timedelta(days=365 * x + rng.randint(1, 364)) for x in ages]
+
+    # Older scouts tend to be further along; completion scales how far.
+    rank_levels = [min(rank_count, max(0, int(rng.gauss((x - 10) * completion * 1.2, 1.0)))) for x in ages]
+
+    # Header and per scout rows.
+    rows = [[''] + scout_names]
+    rows.append(['DOB'] + [format_date(x) for x in dobs])
+    rows.append(['Age'] + [str(x) for x in ages])
+    rows.append(['Current Rank'] + [export_rank_names[x - 1] if x else '' for x in rank_levels])
+
+    # Each rank has a status row then the requirements for every version.
+    for rank_index, (scout_rank, reqs) in enumerate(rank_requirements().items()):
+        rows.append([scout_rank] + [format_date(report_date - timedelta(days=rng.randint(30, 900))) if rank_index < x else '' for x in rank_levels])
+        scout_versions = [rng.randrange(version_count) for _ in scout_names]
+        for version_index in range(version_count):
+            rows.append([f'{scout_rank} {version_years[version_index]}'] + ['X' if x == version_index else '' for x in scout_versions])
+            for req in version_requirements(reqs, version_index, rng):
+                req_statuses = list()
+                for scout_level, scout_version in zip(rank_levels, scout_versions):
+                    req_done = scout_version == version_index and (rank_index < scout_level or (rank_index == scout_level and rng.random() < completion))
+                    req_statuses.append(format_date(report_date - timedelta(days=rng.randint(1, 900))) if req_done else '')
+                rows.append([f'{req}. Complete requirement {req} for {scout_rank}, as described in the handbook.'] + req_statuses)
+
+    # Write the file.
+    with open(csv_file, 'w', newline='') as dF:
+        csv.writer(dF, quoting=csv.QUOTE_ALL).writerows(rows)
+
+def time_phase(results, phase, scout_count, repeat, function):
+    '''Time a phase, keeping the best of the repeats.'''
+    phase_times = list()
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        phase_times.append(time.perf_counter() - start_time)
+    results.append({'phase': phase, 'scouts': scout_count, 'seconds': min(phase_times), 'repeat': repeat})
+
+def run_benchmark(scout_counts, version_count, completion, aged_out, repeat, output_format, work_dir):
+    '''Generate a report for each roster size and time each phase.'''
+    results = list()
+    for scout_count in scout_counts:
+
+        # Generate the report.
+        csv_file = os.path.join(work_dir, f'ReportBuilder_Bench{scout_count}_Rank_Requirements_20240429.csv')
+        generate_report(csv_file, scout_count, version_count, completion, aged_out, seed=scout_count)
+        plot_scout_advancement = PlotScoutAdvancement(csv_file, False, output_format=output_format)
+        cache = SnapshotCache(os.path.join(work_dir, 'cache'))
+
+        # Parse without and with the snapshot cache.
+        time_phase(results, 'read_data', scout_count, repeat, plot_scout_advancement.read_data)
+        plot_scout_advancement.read_data(cache)
+        time_phase(results, 'read_data_cached', scout_count, repeat, lambda: plot_scout_advancement.read_data(cache))
+
+        # Text and deadlines.
+        with open(os.devnull, 'w') as dF, contextlib.redirect_stdout(dF):
+            time_phase(results, 'dump_data', scout_count, repeat, plot_scout_advancement.dump_data)
+        time_phase(results, 'eagle_deadlines', scout_count, repeat, plot_scout_advancement.eagle_deadlines)
+
+        # Rendering.
+        time_phase(results, 'plot_advancement', scout_count, repeat, lambda: plot_scout_advancement.plot_advancement(os.path.join(work_dir, 'scout_advancement')))
+        time_phase(results, 'plot_trip_template', scout_count, repeat, lambda: plot_scout_advancement.plot_trip_template(os.path.join(work_dir, 'event_checklist')))
+        time_phase(results, 'render', scout_count, repeat, lambda: plot_scout_advancement.render(output_dir=work_dir))
+    return results
+
+def main(sysargs):
+    '''For command line running.'''
+
+    # Create the argument parser.
+    parser = argparse.ArgumentParser(description='Generate synthetic ScoutBook exports and time each phase.')
+    parser.add_argument('--generate', help='only write one synthetic CSV file to this path')
+    parser.add_argument('--scouts', default='10,50,200', help='comma separated roster sizes')
+    parser.add_argument('--versions', type=int, default=2, choices=range(1, len(version_years) + 1), help='requirement versions per rank')
+    parser.add_argument('--completion', type=float, default=0.5, help='fraction of requirements completed (0 to 1)')
+    parser.add_argument('--aged-out', type=float, default=0.05, help='fraction of scouts aged out')
+    parser.add_argument('--repeat', type=int, default=3, help='repeats per phase, best time is kept')
+    parser.add_argument('--format', choices=('png', 'svg'), default='png')
+    parser.add_argument('--output', default='benchmark_results.jsonl', help='JSON lines file results are appended to')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(sysargs)
+    scout_counts = [int(x) for x in args.scouts.split(',')]
+
+    # Just write a file.
+    if args.generate:
+        generate_report(args.generate, scout_counts[0], args.versions, args.completion, args.aged_out, seed=args.seed)
+        return
+
+    # Time the phases in a scratch directory.
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_benchmark(scout_counts, args.versions, args.completion, args.aged_out, args.repeat, args.format, work_dir)
+
+    # Record the run so results are comparable over time.
+    run_info = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'versions': args.versions,
+        'completion': args.completion,
+        'format': args.format,
+        }
+    with open(args.output, 'a') as dF:
+        for result in results:
+            dF.write(json.dumps({**run_info, **result}) + '\n')
+
+    # Print the table.
+    print(f'{"phase":<20s} {"scouts":>7s} {"seconds":>9s} {"scouts/s":>10s}')
+    for result in results:
+        print(f'{result["phase"]:<20s} {result["scouts"]:>7d} {result["seconds"]:>9.4f} {result["scouts"] / max(result["seconds"], 1e-9):>10.0f}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
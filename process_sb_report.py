@@ -3,13 +3,32 @@
 import os
 import re
 import sys
+import csv
+import json
+import mmap
+import time
+import glob
+import pickle
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import cProfile
+import functools
+import tracemalloc
 import argparse
-from datetime import datetime, timedelta
-from PIL import Image, ImageDraw, ImageFont
+import contextlib
+from xml.sax.saxutils import escape
+from collections import Counter, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+
+# PIL is imported by load_pil the first time something is drawn, so text-only runs start faster.
+Image = ImageColor = ImageDraw = ImageFont = None
 
 # TODO:
 #   - Add merit badge information (?).
-#   - Align requirement columns (e.g. some scouts have "6a"/"6b" and others only "6").
 
 # In report builder:
 #   - Select scouts.
@@ -22,6 +41,1015 @@ from PIL import Image, ImageDraw, ImageFont
 #       - Check "Show DOB"
 #       - Check "Show Age"
 
+# Row event types produced when streaming the report.
+ROW_HEADER = 'header'
+ROW_DOB = 'dob'
+ROW_AGE = 'age'
+ROW_CURRENT_RANK = 'current rank'
+ROW_RANK_STATUS = 'rank status'
+ROW_VERSION = 'version'
+ROW_REQUIREMENT = 'requirement'
+RowEvent = namedtuple('RowEvent', ('kind', 'values', 'rank', 'version', 'req', 'text'))
+
+class Profiler:
+    '''Wall and CPU time, peak memory and counters for each phase, reported as JSON.'''
+
+    def __init__(self, enabled=False):
+        '''Constructor.'''
+        self.enabled = enabled
+        self.memory = False
+        self.phases = dict()
+        self.counters = Counter()
+        self.phase_stack = list()
+        self.phase_peaks = list()
+
+    def reset(self):
+        '''Clear the phases and counters.'''
+        self.phases = dict()
+        self.counters = Counter()
+
+    def write(self, file_name, extra=None):
+        '''Write the report as JSON, to stdout for "-".'''
+        profile_json = json.dumps({**(extra or dict()), **self.report()}, indent=2)
+        if file_name == '-':
+            print(profile_json)
+        else:
+            with open(file_name, 'w') as dF:
+                dF.write(profile_json + '\n')
+
+    def enable(self, memory=False):
+        '''Start collecting, optionally tracing Python allocations for peak memory, which slows everything it times.'''
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing(): tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''Time a phase; nested phases are named by their path (e.g. "read_data/parse").'''
+        if not self.enabled:
+            yield
+            return
+
+        # Start the clocks.
+        self.phase_stack.append(name)
+        self.phase_peaks.append(0)
+        phase_name = '/'.join(self.phase_stack)
+        if self.memory: tracemalloc.reset_peak()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+
+            # Add to the phase totals, since paged renders repeat phases.
+            phase_stats = self.phases.setdefault(phase_name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            phase_stats['calls'] += 1
+            phase_stats['wall_s'] += time.perf_counter() - start_wall
+            phase_stats['cpu_s'] += time.process_time() - start_cpu
+
+            # Nested phases reset the traced peak, so carry theirs up to the enclosing phase.
+            phase_peak = max(self.phase_peaks.pop(), tracemalloc.get_traced_memory()[1] if self.memory else 0)
+            if self.memory: phase_stats['peak_traced_bytes'] = max(phase_stats.get('peak_traced_bytes', 0), phase_peak)
+            if self.phase_peaks: self.phase_peaks[-1] = max(self.phase_peaks[-1], phase_peak)
+            self.phase_stack.pop()
+
+    def timed(self, name):
+        '''Decorator to time a whole function as a phase.'''
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, count=1):
+        '''Add to a counter.'''
+        if self.enabled: self.counters[name] += count
+
+    def report(self):
+        '''Phases, counters and peak memory as a JSON-ready dict, noting whether the times include tracemalloc overhead.'''
+        profile_report = {'tracemalloc': self.memory, 'phases': self.phases, 'counters': dict(self.counters)}
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            profile_report['max_rss_bytes'] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+        except ImportError:
+            pass
+        return profile_report
+
+# Process-wide profiler, enabled by --profile.
+PROFILER = Profiler()
+
+# Bump when the parsed model changes so cached snapshots are re-parsed.
+PARSER_VERSION = 3
+
+# Patterns used on every row.
+LETTER_PATTERN = re.compile('[a-zA-Z]')
+VERSION_PATTERN = re.compile(r'(?P<rank>.*) (?P<version>v\d\d\d\d)')
+REQ_PATTERN = re.compile(r'(?P<req>\d+[a-z]?)\. ?')
+REQ_ID_PATTERN = re.compile(r'(?P<number>\d+)(?P<letter>[a-z]*)')
+DATE_PATTERN = re.compile(r'\d+/\d+/\d+')
+
+def normalize_name(scout_name):
+    '''Compare names ignoring case and repeated spaces.'''
+    return ' '.join(scout_name.split()).casefold()
+
+def read_patrol(patrol_file):
+    '''Scout names from a patrol file, one per line, skipping blank lines and # comments.'''
+    with open(patrol_file, 'r') as dF:
+        return [x.strip() for x in dF if x.strip() and not x.lstrip().startswith('#')]
+
+def parse_events(event_specs):
+    '''Events as "NAME" for everyone or "NAME=PATROL_FILE" for the scouts in a patrol file.'''
+    events = list()
+    for event_spec in event_specs:
+        event_name, _, patrol_file = event_spec.partition('=')
+        events.append((event_name.strip(), read_patrol(patrol_file) if patrol_file else None))
+    return events
+
+def first_cell(line):
+    '''First cell of a CSV line without tokenizing the rest of it.'''
+    if not line.startswith(b'"'):
+        return line.split(b',', 1)[0].strip().decode()
+
+    # Quoted cells end at a quote that isn't doubled.
+    index = 1
+    while True:
+        index = line.find(b'"', index)
+        if index < 0 or line[index + 1:index + 2] != b'"': break
+        index += 2
+    return line[1:index].replace(b'""', b'"').strip().decode()
+
+def req_sort_key(req):
+    '''Sort requirements by number first, then by letter.'''
+    match = REQ_ID_PATTERN.match(req)
+    return (int(match.group('number')), match.group('letter'))
+
+class RankMatrix:
+    '''Requirement completion for one rank, stored as scouts by requirement columns.'''
+
+    def __init__(self, reqs, versions, awards):
+        '''Constructor.'''
+
+        # Requirement columns are the union of all versions, sorted by number.
+        self.reqs = tuple(sorted(reqs, key=req_sort_key))
+        self.req_array = np.array(self.reqs, dtype=object)
+        self.columns = {req: index for index, req in enumerate(self.reqs)}
+
+        # Per scout rank version and award date.
+        self.versions = versions
+        self.awards = awards
+        self.awarded = np.array([bool(DATE_PATTERN.match(x)) for x in awards], dtype=bool)
+
+        # Requirement is in the scout's version, is complete and the recorded date.
+        shape = (len(versions), len(self.reqs))
+        self.present = np.zeros(shape, dtype=bool)
+        self.done = np.zeros(shape, dtype=bool)
+        self.dates = np.full(shape, '', dtype=object)
+
+    def to_state(self):
+        '''Plain data for the snapshot cache.'''
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, state):
+        '''Rebuild from the snapshot cache.'''
+        rank_matrix = cls.__new__(cls)
+        rank_matrix.__dict__.update(state)
+        return rank_matrix
+
+    def set_column(self, req, scout_mask, statuses, backfill):
+        '''Set one requirement for the scouts working on its version.'''
+        col = self.columns[req]
+        self.present[scout_mask, col] = True
+        self.dates[scout_mask, col] = statuses[scout_mask]
+        self.done[scout_mask, col] = (statuses != '')[scout_mask] | backfill[scout_mask]
+
+    def done_counts(self):
+        '''Number of completed requirements for each scout.'''
+        return self.done.sum(axis=1)
+
+    def remaining(self):
+        '''Requirements not completed and not covered by a rank award.'''
+        return self.present & ~self.done & ~self.awarded[:, None]
+
+class RequirementCatalog:
+    '''Matrix column, display position, category and minimum duration for every rank version requirement.'''
+
+    def __init__(self, req_matrix, version_reqs, do_req_where, req_min_durations):
+        '''Constructor.'''
+
+        # Categories in the order they are checked, so the first that lists a requirement wins.
+        self.categories = tuple(do_req_where)
+        self.columns = dict()
+        self.category_indices = dict()
+        self.min_days = dict()
+        self.positions = dict()
+        self.widths = dict()
+        for scout_rank, rank_matrix in req_matrix.items():
+            rank_versions = version_reqs.get(scout_rank, dict())
+
+            # Per column lookups, in the matrix column order.
+            self.columns[scout_rank] = rank_matrix.columns
+            category_indices = [-1] * len(rank_matrix.reqs)
+            for req_col, req in enumerate(rank_matrix.reqs):
+                for category_index, category in enumerate(self.categories):
+                    if req in do_req_where[category][scout_rank]:
+                        category_indices[req_col] = category_index
+                        break
+            self.category_indices[scout_rank] = np.array(category_indices, dtype=int)
+            self.min_days[scout_rank] = np.array([req_min_durations[scout_rank].get(x, 0) for x in rank_matrix.reqs], dtype=int)
+
+            # Align columns by requirement number, e.g. "6" in one version lines up with "6a" in another.
+            positions = np.zeros(len(rank_matrix.reqs), dtype=int)
+            position = 0
+            req_groups = dict()
+            for req in rank_matrix.reqs:
+                req_groups.setdefault(req_sort_key(req)[0], list()).append(req)
+            for group_reqs in req_groups.values():
+                lettered = [x for x in group_reqs if not x.isdigit()]
+                bare = [x for x in group_reqs if x.isdigit()]
+
+                # A version with both "6" and "6a" needs its own column for "6".
+                both = any(set(bare) & set(x) and set(lettered) & set(x) for x in rank_versions.values())
+                for req in bare:
+                    positions[rank_matrix.columns[req]] = position
+                for index, req in enumerate(lettered):
+                    positions[rank_matrix.columns[req]] = position + both + index
+                position += max(len(lettered) + both, 1)
+            self.positions[scout_rank] = positions
+            self.widths[scout_rank] = position
+
+    def category(self, scout_rank, req_col):
+        '''Category name for a requirement column, or None.'''
+        category_index = self.category_indices[scout_rank][req_col]
+        return self.categories[category_index] if category_index >= 0 else None
+
+def file_key(csv_file, scouts=None):
+    '''Hash the file contents with the parser version and scout selection.'''
+    file_hash = hashlib.sha256(f'parser {PARSER_VERSION}\n'.encode())
+    if scouts: file_hash.update(('scouts ' + '|'.join(sorted(normalize_name(x) for x in scouts)) + '\n').encode())
+    with open(csv_file, 'rb') as dF:
+        for chunk in iter(lambda: dF.read(1 << 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+@functools.lru_cache(maxsize=65536)
+def iso_date(date_str):
+    '''Export dates (month/day/two digit year) as YYYY-MM-DD, or None if there isn't one.'''
+    if not DATE_PATTERN.match(date_str or ''):
+        return None
+    month, day, year = (int(x) for x in date_str.split('/')[:3])
+    if year < 100: year += 2000
+    return f'{year:04d}-{month:02d}-{day:02d}'
+
+class SnapshotCache:
+    '''On-disk cache of parsed reports keyed by file content and parser version.'''
+
+    def __init__(self, cache_dir=None, max_bytes=256 * 1024 * 1024):
+        '''Constructor.'''
+        if cache_dir is None:
+            cache_root = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+            cache_dir = os.path.join(cache_root, 'scout_utilities')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        # An unwritable location turns the cache off rather than failing the run.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError:
+            self.cache_dir = None
+
+    def key(self, csv_file, scouts=None, rank_progression=()):
+        '''Hash the file contents with the parser version, scout selection and the ranks parsed.'''
+        return hashlib.sha256(f'{file_key(csv_file, scouts)}\nranks {"|".join(rank_progression)}\n'.encode()).hexdigest()
+
+    def load(self, key):
+        '''Load a snapshot, or None if it isn't cached. Entries that can't be unpickled are removed.'''
+        if self.cache_dir is None: return None
+        cache_file = os.path.join(self.cache_dir, f'{key}.pickle')
+        try:
+            with open(cache_file, 'rb') as dF:
+                snapshot = pickle.load(dF)
+            os.utime(cache_file)
+        except FileNotFoundError:
+            return None
+
+        # Truncated files, or pickles of classes from other library versions.
+        except Exception:
+            self.discard(key)
+            return None
+        return snapshot
+
+    def discard(self, key):
+        '''Remove a snapshot that can't be used.'''
+        if self.cache_dir is None: return
+        with contextlib.suppress(OSError): os.remove(os.path.join(self.cache_dir, f'{key}.pickle'))
+
+    def store(self, key, snapshot):
+        '''Store a snapshot, then evict the least recently used ones over the size cap. Write errors skip the store.'''
+        if self.cache_dir is None: return
+
+        # Write to a unique temporary file so parallel workers don't collide, then rename into place.
+        temp_file = None
+        try:
+            temp_handle, temp_file = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            with os.fdopen(temp_handle, 'wb') as dF:
+                pickle.dump(snapshot, dF, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, os.path.join(self.cache_dir, f'{key}.pickle'))
+        except OSError:
+            if temp_file is not None:
+                with contextlib.suppress(OSError): os.remove(temp_file)
+            return
+        self.evict()
+
+    def evict(self):
+        '''Remove the least recently used snapshots until under the size cap. Entries another worker removed are skipped.'''
+        cache_entries = list()
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.pickle'):
+                    with contextlib.suppress(FileNotFoundError):
+                        entry_stat = entry.stat()
+                        cache_entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        except OSError:
+            return
+        cache_bytes = sum(x[1] for x in cache_entries)
+        for _, entry_size, entry_path in sorted(cache_entries):
+            if cache_bytes <= self.max_bytes: break
+            with contextlib.suppress(OSError): os.remove(entry_path)
+            cache_bytes -= entry_size
+
+class AdvancementHistory:
+    '''SQLite store of every ingested export, for queries across report dates.'''
+
+    # Scouts and ranks are integer keys so the requirement indexes stay small.
+    schema = '''
+        CREATE TABLE IF NOT EXISTS reports (
+            report_id INTEGER PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            report_date TEXT NOT NULL,
+            file_key TEXT NOT NULL UNIQUE,
+            ingested_at TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS scout_names (
+            scout_id INTEGER PRIMARY KEY,
+            scout_name TEXT NOT NULL UNIQUE);
+        CREATE TABLE IF NOT EXISTS rank_names (
+            rank_order INTEGER PRIMARY KEY,
+            rank TEXT NOT NULL UNIQUE);
+        CREATE TABLE IF NOT EXISTS scouts (
+            report_id INTEGER NOT NULL,
+            scout_id INTEGER NOT NULL,
+            dob TEXT,
+            age INTEGER,
+            current_rank TEXT,
+            PRIMARY KEY (report_id, scout_id)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS ranks (
+            report_id INTEGER NOT NULL,
+            scout_id INTEGER NOT NULL,
+            rank_order INTEGER NOT NULL,
+            version TEXT,
+            award_date TEXT,
+            PRIMARY KEY (report_id, scout_id, rank_order)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS requirements (
+            report_id INTEGER NOT NULL,
+            scout_id INTEGER NOT NULL,
+            rank_order INTEGER NOT NULL,
+            req TEXT NOT NULL,
+            version TEXT,
+            done INTEGER NOT NULL,
+            completed_date TEXT,
+            PRIMARY KEY (report_id, scout_id, rank_order, req)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS completions (
+            scout_id INTEGER NOT NULL,
+            rank_order INTEGER NOT NULL,
+            req TEXT NOT NULL,
+            completed_date TEXT NOT NULL,
+            report_id INTEGER NOT NULL,
+            PRIMARY KEY (scout_id, rank_order, req)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS reports_date ON reports (report_date);
+        CREATE INDEX IF NOT EXISTS scouts_scout ON scouts (scout_id, report_id);
+        CREATE INDEX IF NOT EXISTS ranks_scout ON ranks (scout_id, rank_order, award_date);
+        CREATE INDEX IF NOT EXISTS requirements_scout ON requirements (scout_id, rank_order, req, report_id);
+        CREATE INDEX IF NOT EXISTS completions_date ON completions (completed_date, rank_order);
+        '''
+
+    def __init__(self, db_file):
+        '''Constructor.'''
+        self.db_file = db_file
+        self.connection = sqlite3.connect(db_file, timeout=60)
+        self.connection.executescript(type(self).schema)
+
+    def close(self):
+        '''Close the database.'''
+        self.connection.close()
+
+    def scout_ids(self, scout_names):
+        '''Integer key for each scout name, adding new names.'''
+        self.connection.executemany('INSERT OR IGNORE INTO scout_names (scout_name) VALUES (?)', ((x,) for x in scout_names))
+        name_ids = dict(self.connection.execute('SELECT scout_name, scout_id FROM scout_names'))
+        return [name_ids[x] for x in scout_names]
+
+    @PROFILER.timed('history_ingest')
+    def ingest(self, plot_scout_advancement):
+        '''Add a parsed export in one transaction, returning False if the same file was already added.'''
+        report_key = file_key(plot_scout_advancement.csv_file, plot_scout_advancement.scouts)
+        report_date = '-'.join(plot_scout_advancement.report_date)
+        data_dict = plot_scout_advancement.data_dict
+        scout_names = plot_scout_advancement.scout_names
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO reports (file_name, report_date, file_key, ingested_at) VALUES (?, ?, ?, ?)',
+                (os.path.basename(plot_scout_advancement.csv_file), report_date, report_key, datetime.now().isoformat(timespec='seconds')))
+            if not cursor.rowcount:
+                return False
+            report_id = cursor.lastrowid
+
+            # Scouts and their ranks.
+            scout_ids = self.scout_ids(scout_names)
+            self.connection.executemany('INSERT INTO scouts VALUES (?, ?, ?, ?, ?)', (
+                (report_id, x, iso_date(data_dict[y]['dob']), int(data_dict[y]['age']), data_dict[y]['rank']) for x, y in zip(scout_ids, scout_names)))
+            self.connection.executemany('INSERT OR IGNORE INTO rank_names VALUES (?, ?)', enumerate(plot_scout_advancement.req_matrix))
+            for rank_order, rank_matrix in enumerate(plot_scout_advancement.req_matrix.values()):
+                versions = [x or None for x in rank_matrix.versions.tolist()]
+                awards = [iso_date(x) for x in rank_matrix.awards.tolist()]
+                self.connection.executemany('INSERT INTO ranks VALUES (?, ?, ?, ?, ?)', (
+                    (report_id, x, rank_order, y, z) for x, y, z in zip(scout_ids, versions, awards)))
+
+                # Every requirement in each scout's version, in primary key order.
+                scout_indices, req_cols = np.nonzero(rank_matrix.present)
+                req_order = np.lexsort((rank_matrix.req_array[req_cols].astype(str), np.array(scout_ids)[scout_indices]))
+                scout_indices, req_cols = scout_indices[req_order].tolist(), req_cols[req_order].tolist()
+                requirement_rows = [
+                    (report_id, scout_ids[x], rank_order, rank_matrix.reqs[y], versions[x], int(rank_matrix.done[x, y]), iso_date(rank_matrix.dates[x, y]))
+                    for x, y in zip(scout_indices, req_cols)]
+                self.connection.executemany('INSERT INTO requirements VALUES (?, ?, ?, ?, ?, ?, ?)', requirement_rows)
+
+                # Each dated completion is kept once, from the first export that has it.
+                self.connection.executemany('INSERT OR IGNORE INTO completions VALUES (?, ?, ?, ?, ?)', (
+                    (x[1], rank_order, x[3], x[6], report_id) for x in requirement_rows if x[6]))
+        return True
+
+    def completed_per_month(self, scout_name=None, scout_rank=None):
+        '''Requirements completed in each month.'''
+        return self.connection.execute('''
+            SELECT substr(completed_date, 1, 7) AS month, COUNT(*) FROM completions
+            WHERE (?1 IS NULL OR scout_id = (SELECT scout_id FROM scout_names WHERE scout_name = ?1))
+              AND (?2 IS NULL OR rank_order = (SELECT rank_order FROM rank_names WHERE rank = ?2))
+            GROUP BY month ORDER BY month''', (scout_name, scout_rank)).fetchall()
+
+    def rank_intervals(self, scout_name=None):
+        '''Days from each rank to the next for every scout, from the earliest recorded award dates.'''
+        return self.connection.execute('''
+            WITH awards AS (
+                SELECT scout_id, rank_order, MIN(award_date) AS award_date FROM ranks
+                WHERE award_date IS NOT NULL AND (?1 IS NULL OR scout_id = (SELECT scout_id FROM scout_names WHERE scout_name = ?1))
+                GROUP BY scout_id, rank_order)
+            SELECT scout_name, rank, award_date,
+                   julianday(award_date) - julianday(LAG(award_date) OVER (PARTITION BY awards.scout_id ORDER BY awards.rank_order)) AS days
+            FROM awards JOIN scout_names USING (scout_id) JOIN rank_names USING (rank_order)
+            ORDER BY scout_name, awards.rank_order''', (scout_name,)).fetchall()
+
+    def rank_interval_summary(self):
+        '''Scouts, average and longest days to reach each rank from the one before.'''
+        rank_days = dict()
+        for _, scout_rank, _, days in self.rank_intervals():
+            if days is not None: rank_days.setdefault(scout_rank, list()).append(days)
+        rank_order = {x: index for index, x in self.connection.execute('SELECT rank_order, rank FROM rank_names')}
+        return [(x, len(y), sum(y) / len(y), max(y)) for x, y in sorted(rank_days.items(), key=lambda x: rank_order[x[0]])]
+
+class EagleDeadlines:
+    '''Age-out dates and remaining minimum days for all scouts at once.'''
+
+    def __init__(self, req_matrix, rank_indices, dobs, catalog, now=None):
+        '''Constructor.'''
+
+        # Rank order comes from the requirement matrices.
+        self.now = np.datetime64(now or datetime.now(), 's')
+        rank_names = tuple(req_matrix)
+        life_index = rank_names.index('Life Scout')
+
+        # Add days for requirements not completed, skipping the rank they're currently working on.
+        # Minimum rank times also count a day for every requirement outside the ' Scout' ranks.
+        self.min_rank_times = dict()
+        self.remain_days = np.zeros(len(rank_indices), dtype=int)
+        for rank_index, (scout_rank, rank_matrix) in enumerate(req_matrix.items()):
+            req_days = catalog.min_days[scout_rank]
+            req_days_min = req_days if ' Scout' in scout_rank else np.where(req_days > 0, req_days, 1)
+            self.min_rank_times[scout_rank] = int((rank_matrix.present @ req_days_min).max(initial=0))
+            rank_days = (rank_matrix.present & ~rank_matrix.done) @ req_days
+            self.remain_days += np.where(rank_indices + 1 == rank_index, 0, rank_days)
+
+        # Scouts age out on their 18th birthday (DOB is month/day/two digit year).
+        dob_array = np.array([x.split('/') for x in dobs], dtype=int).reshape(-1, 3)
+        dob_year = np.where(dob_array[:, 2] < 100, dob_array[:, 2] + 2000, dob_array[:, 2])
+        age_out_month = (dob_year + 18 - 1970).astype('datetime64[Y]') + (dob_array[:, 0] - 1).astype('timedelta64[M]')
+        self.age_out = age_out_month.astype('datetime64[D]') + (dob_array[:, 1] - 1).astype('timedelta64[D]')
+
+        # Last date to advance, or the remaining days to complete Eagle once Life.
+        self.advance_by = self.age_out - self.remain_days.astype('timedelta64[D]')
+        self.complete = rank_indices == life_index
+        days_to_age_out = (self.age_out - self.now) // np.timedelta64(1, 'D')
+        self.days_left = np.where(self.complete, days_to_age_out, self.remain_days)
+
+    def eagle_text(self, scout_index):
+        '''Describe the Eagle deadline for one scout.'''
+        eagle_str = 'Complete' if self.complete[scout_index] else 'Advance'
+        advance_by = str(self.advance_by[scout_index]).replace('-', '_')
+        return f'{eagle_str} by {advance_by}, {self.days_left[scout_index]} days remaining'
+
+class RequirementIndex:
+    '''Scouts missing each requirement, and requirements by where they can be done, for quick lookups.'''
+
+    def __init__(self, req_matrix, catalog, scout_names, scout_order):
+        '''Constructor.'''
+
+        # Scouts are listed in chart order.
+        self.scout_names = scout_names
+        order_positions = np.empty(len(scout_names), dtype=int)
+        scout_index = {x: index for index, x in enumerate(scout_names)}
+        order_positions[[scout_index[x] for x in scout_order]] = np.arange(len(scout_order))
+        self.order_positions = order_positions
+
+        # Scouts that still need each requirement, and the requirements in each category.
+        self.missing_scouts = dict()
+        self.category_reqs = {x: list() for x in catalog.categories}
+        self.category_reqs[None] = list()
+        for scout_rank, rank_matrix in req_matrix.items():
+            remaining = rank_matrix.remaining()
+            for req_col, req in enumerate(rank_matrix.reqs):
+                scout_indices = np.flatnonzero(remaining[:, req_col])
+                self.missing_scouts[(scout_rank, req)] = scout_indices[np.argsort(order_positions[scout_indices], kind='stable')]
+                self.category_reqs[catalog.category(scout_rank, req_col)].append((scout_rank, req))
+
+    def missing(self, scout_rank, req):
+        '''Names of the scouts that still need a requirement, in chart order.'''
+        return [self.scout_names[x] for x in self.missing_scouts.get((scout_rank, req), ())]
+
+    def query(self, scout_rank=None, req=None, category=None):
+        '''Requirements matching the rank, requirement and category, with the scouts still needing each.'''
+        if category is not None:
+            keys = self.category_reqs.get(category, ())
+        else:
+            keys = self.missing_scouts
+        results = list()
+        for key in keys:
+            if scout_rank is not None and key[0] != scout_rank: continue
+            if req is not None and key[1] != req: continue
+            if len(self.missing_scouts[key]): results.append((key[0], key[1], self.missing(*key)))
+        return results
+
+class MeetingPlanner:
+    '''Greedy choice of meeting or outing topics that cover the most weighted scout requirements.'''
+
+    # Each topic a scout is covered by scales that scout's weight, so later picks favor other scouts.
+    scout_decay = 0.5
+
+    # Requirements for later ranks count less than the rank the scout is working on.
+    rank_decay = 0.5
+
+    def __init__(self, req_matrix, catalog, rank_indices, eagle_deadlines, categories):
+        '''Constructor.'''
+
+        # One coverage mask per candidate topic over all scouts.
+        self.topics = list()
+        cover_rows = list()
+        weight_rows = list()
+        for rank_index, (scout_rank, rank_matrix) in enumerate(req_matrix.items()):
+            remaining = rank_matrix.remaining()
+            rank_weights = type(self).rank_decay ** np.maximum(rank_index - (rank_indices + 1), 0)
+            for req_col, req in enumerate(rank_matrix.reqs):
+                if catalog.category(scout_rank, req_col) not in categories or not remaining[:, req_col].any(): continue
+                self.topics.append((scout_rank, req))
+                cover_rows.append(remaining[:, req_col])
+
+                # Time-critical requirements count up to twice as much, since their clock only starts once they're begun.
+                weight_rows.append(rank_weights * (1 + np.log1p(catalog.min_days[scout_rank][req_col]) / np.log1p(365)))
+        self.cover = np.array(cover_rows, dtype=bool).reshape(len(self.topics), len(rank_indices))
+        self.weights = np.array(weight_rows, dtype=float).reshape(self.cover.shape) * self.cover
+
+        # Scouts closer to their last day to advance count more; those already past it count as usual.
+        slack_days = (eagle_deadlines.advance_by - eagle_deadlines.now.astype('datetime64[D]')) // np.timedelta64(1, 'D')
+        self.urgency = np.where(slack_days > 0, 1 + 365 / np.maximum(slack_days, 30), 1.0)
+
+    def plan(self, topic_count):
+        '''Pick topics one at a time by weighted coverage, returning (rank, requirement, scout indices, score) for each.'''
+        scout_weights = self.urgency.copy()
+        available = np.ones(len(self.topics), dtype=bool)
+        picks = list()
+        for _ in range(min(topic_count, len(self.topics))):
+            scores = np.where(available, self.weights @ scout_weights, -np.inf)
+            topic_index = int(np.argmax(scores))
+            if scores[topic_index] <= 0: break
+            available[topic_index] = False
+            scout_weights[self.cover[topic_index]] *= type(self).scout_decay
+            picks.append((*self.topics[topic_index], np.flatnonzero(self.cover[topic_index]), float(scores[topic_index])))
+        return picks
+
+# Render threads can import PIL at the same time.
+PIL_LOCK = threading.Lock()
+
+def load_pil():
+    '''Import PIL the first time it is needed. Image is set last, so once it is set the other modules are too.'''
+    global Image, ImageColor, ImageDraw, ImageFont
+    if Image is not None: return
+    with PIL_LOCK:
+        if Image is None:
+            from PIL import ImageColor, ImageDraw, ImageFont
+            from PIL import Image
+
+class FontRegistry:
+    '''Resolve logical fonts against the search paths and load each (face, size) once.'''
+
+    # Font files for each logical face, in order of preference.
+    font_faces = {
+        'mono':  ('Andale Mono.ttf', 'DejaVuSansMono.ttf', 'LiberationMono-Regular.ttf', 'SourceCodePro-Regular.ttf', 'consola.ttf', 'cour.ttf'),
+        'title': ('Andale Mono.ttf', 'DejaVuSansMono.ttf', 'LiberationMono-Regular.ttf', 'SourceCodePro-Regular.ttf', 'consola.ttf', 'cour.ttf'),
+        'bold':  ('Courier New Bold.ttf', 'courbd.ttf', 'DejaVuSansMono-Bold.ttf', 'LiberationMono-Bold.ttf', 'SourceCodePro-Bold.ttf', 'consolab.ttf'),
+        }
+
+    # Fonts bundled next to the script.
+    bundled_font_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+
+    # The usual macOS, Linux and Windows locations.
+    system_font_dirs = (
+        '/System/Library/Fonts/Supplemental',
+        '/System/Library/Fonts',
+        '/Library/Fonts',
+        os.path.expanduser('~/Library/Fonts'),
+        '/usr/share/fonts',
+        '/usr/local/share/fonts',
+        os.path.expanduser('~/.local/share/fonts'),
+        os.path.expanduser('~/.fonts'),
+        os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+        )
+
+    def __init__(self, search_paths=()):
+        '''Constructor.'''
+        self.lock = threading.RLock()
+        self.search_paths = list()
+        self.font_files = list()
+        self.fonts = dict()
+        self.add_search_paths(search_paths)
+        self.add_search_paths(x for x in os.environ.get('SCOUT_FONT_PATH', '').split(os.pathsep) if x)
+
+    def add_search_paths(self, search_paths):
+        '''Search these directories before the system ones, reindexing only if one is new.'''
+        with self.lock:
+            new_paths = [x for x in dict.fromkeys(search_paths) if x not in self.search_paths]
+            self.search_paths += new_paths
+            if new_paths:
+                self.font_files = list()
+                self.fonts = dict()
+
+    def find_font_files(self):
+        '''Index font file names to paths for the search paths, the bundled fonts and the system fonts in turn, first found wins within each.'''
+        with self.lock:
+            if not self.font_files:
+                font_files = list()
+                for font_dirs in (self.search_paths, [type(self).bundled_font_dir], type(self).system_font_dirs):
+                    tier_files = dict()
+                    for font_dir in font_dirs:
+                        for dir_path, _, file_names in os.walk(font_dir):
+                            for file_name in file_names:
+                                tier_files.setdefault(file_name, os.path.join(dir_path, file_name))
+                    font_files.append(tier_files)
+                self.font_files = font_files
+            return self.font_files
+
+    def resolve(self, face):
+        '''Path to the font file for a logical face, or None if none are installed. Any preferred font in the search paths beats the system ones.'''
+        assert face in type(self).font_faces, \
+            f'[ERROR] Unknown font face "{face}".'
+        for tier_files in self.find_font_files():
+            for font_name in type(self).font_faces[face]:
+                if font_name in tier_files:
+                    return tier_files[font_name]
+        return None
+
+    def font(self, face, size):
+        '''Load the font for a logical face, falling back to the default font.'''
+        font_key = (face, size)
+        font = self.fonts.get(font_key)
+        if font is not None:
+            return font
+
+        # Render threads share the registry, so load each font once under the lock.
+        with self.lock:
+            if font_key not in self.fonts:
+                load_pil()
+                font_file = self.resolve(face)
+                if font_file is not None:
+                    self.fonts[font_key] = ImageFont.truetype(font_file, size)
+                else:
+                    try:
+                        self.fonts[font_key] = ImageFont.load_default(size)
+                    except TypeError:
+                        self.fonts[font_key] = ImageFont.load_default()
+            return self.fonts[font_key]
+
+# Process-wide fonts, so repeated and batch renders load each font once.
+FONTS = FontRegistry()
+
+# Every color the charts use, in palette index order for palette mode.
+CHART_COLORS = ('white', 'black', 'red', 'palegreen', 'azure', 'cornsilk', 'lavenderblush')
+
+def new_image(image_size, palette=False):
+    '''Create a white canvas, indexed to the chart colors in palette mode.'''
+    load_pil()
+    if not palette:
+        return Image.new('RGB', image_size, 'white')
+    image = Image.new('P', image_size, 0)
+    image.putpalette([x for color in CHART_COLORS for x in ImageColor.getrgb(color)])
+    return image
+
+class CellSprites:
+    '''Requirement cells rasterized once per (label, fill, outline) and pasted into place.'''
+
+    def __init__(self, font, cell_pix, palette=False):
+        '''Constructor.'''
+        self.font = font
+        self.cell_pix = cell_pix
+        self.palette = palette
+        self.sprites = dict()
+
+    def render(self, label, fill_color, outline_color):
+        '''Draw one cell and its paste mask, leaving room for labels wider than the cell.'''
+        label_box = self.font.getbbox(label)
+        sprite_size = (max(self.cell_pix, label_box[2] + 1), max(self.cell_pix + 1, label_box[3] + 1))
+
+        # Palette sprites share the chart palette and need a separate mask; RGBA sprites are their own mask.
+        if self.palette:
+            sprite = new_image(sprite_size, True)
+            mask = Image.new('L', sprite_size, 0)
+            draw_list = [(ImageDraw.Draw(sprite), fill_color, outline_color, 'black'), (ImageDraw.Draw(mask), 255, 255, 255)]
+            draw_list[1][0].fontmode = '1'
+        else:
+            sprite = mask = Image.new('RGBA', sprite_size, (0, 0, 0, 0))
+            draw_list = [(ImageDraw.Draw(sprite), fill_color, outline_color, 'black')]
+
+        # Draw the cell.
+        for draw_sprite, sprite_fill, sprite_outline, text_fill in draw_list:
+            if fill_color is not None:
+                draw_sprite.rectangle(((0, 0), (self.cell_pix - 1, self.cell_pix)), fill=sprite_fill, outline=outline_color and sprite_outline)
+            draw_sprite.text((1, 1), label, font=self.font, fill=text_fill)
+        return sprite, mask
+
+    def paste(self, image, xy, label, fill_color, outline_color):
+        '''Paste the cell, rendering its sprite the first time it's used.'''
+        if fill_color is None: outline_color = None
+        sprite_key = (label, fill_color, outline_color)
+        sprite = self.sprites.get(sprite_key)
+        if sprite is None:
+            sprite = self.sprites[sprite_key] = self.render(label, fill_color, outline_color)
+            PROFILER.count('draw.sprite_render')
+        image.paste(sprite[0], (int(xy[0]), int(xy[1])), sprite[1])
+
+def flatten_coords(xy):
+    '''Coordinates as a flat (x0, y0, x1, y1, ...) tuple.'''
+    if isinstance(xy[0], (tuple, list)):
+        return tuple(x for point in xy for x in point)
+    return tuple(xy)
+
+class DrawingBackend:
+    '''Drawing operations the charts use. Fonts are logical (face, size) pairs.'''
+
+    file_ext = None
+
+    def __init__(self, image_size, palette=False, png_options=None):
+        '''Constructor.'''
+        self.image_size = image_size
+
+    def text(self, xy, text, font, fill):
+        '''Draw text with its top left corner at xy.'''
+        raise NotImplementedError
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        '''Draw a rectangle between two corners, inclusive.'''
+        raise NotImplementedError
+
+    def line(self, xy, fill, width=1):
+        '''Draw a line through the points.'''
+        raise NotImplementedError
+
+    def cell(self, xy, label, font, cell_pix, fill_color, outline_color):
+        '''Draw a requirement cell: optional fill and outline with the label on top.'''
+        if fill_color is not None:
+            self.rectangle(((xy[0], xy[1]), (xy[0] + cell_pix - 1, xy[1] + cell_pix)), fill=fill_color, outline=outline_color)
+        self.text((xy[0] + 1, xy[1] + 1), label, font, 'black')
+
+    def save(self, file_name):
+        '''Write the drawing.'''
+        raise NotImplementedError
+
+    def copy(self, png_options=None):
+        '''Independent copy of the drawing so far, saved with these PNG options if given.'''
+        raise NotImplementedError
+
+    @classmethod
+    def open(cls, file_name, image_size, palette=False, png_options=None):
+        '''Continue drawing on a saved file, or None if the backend can't.'''
+        return None
+
+class PilBackend(DrawingBackend):
+    '''Raster drawing with PIL, saved as PNG.'''
+
+    file_ext = '.png'
+
+    # Cell sprites shared by every page and chart, keyed by font, cell size and palette mode.
+    cell_sprites = dict()
+
+    def __init__(self, image_size, palette=False, png_options=None):
+        '''Constructor.'''
+        super().__init__(image_size)
+        self.palette = palette
+        self.png_options = png_options or dict()
+        self.image = new_image(image_size, palette)
+        self.draw = ImageDraw.Draw(self.image)
+
+    def text(self, xy, text, font, fill):
+        '''Draw text with its top left corner at xy.'''
+        PROFILER.count('draw.text')
+        self.draw.text(xy, text, font=FONTS.font(*font), fill=fill)
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        '''Draw a rectangle between two corners, inclusive.'''
+        PROFILER.count('draw.rectangle')
+        self.draw.rectangle(xy, fill=fill, outline=outline, width=width)
+
+    def line(self, xy, fill, width=1):
+        '''Draw a line through the points.'''
+        PROFILER.count('draw.line')
+        self.draw.line(xy, fill=fill, width=width)
+
+    def cell(self, xy, label, font, cell_pix, fill_color, outline_color):
+        '''Paste the cell from the sprite cache.'''
+        PROFILER.count('draw.cell')
+        sprites_key = (font, cell_pix, self.palette)
+        if sprites_key not in type(self).cell_sprites:
+            type(self).cell_sprites[sprites_key] = CellSprites(FONTS.font(*font), cell_pix, self.palette)
+        type(self).cell_sprites[sprites_key].paste(self.image, xy, label, fill_color, outline_color)
+
+    def save(self, file_name):
+        '''Write the PNG.'''
+        self.image.save(file_name, 'PNG', **self.png_options)
+
+    def copy(self, png_options=None):
+        '''Independent copy of the image so far, saved with these PNG options if given.'''
+        backend = type(self).__new__(type(self))
+        backend.__dict__.update(self.__dict__)
+        if png_options is not None: backend.png_options = png_options
+        backend.image = self.image.copy()
+        backend.draw = ImageDraw.Draw(backend.image)
+        return backend
+
+    @classmethod
+    def open(cls, file_name, image_size, palette=False, png_options=None):
+        '''Continue drawing on a saved PNG with the same size and color mode.'''
+        load_pil()
+        try:
+            with Image.open(file_name) as image:
+                image.load()
+        except OSError:
+            return None
+        return cls.from_image(image, image_size, palette, png_options)
+
+    @classmethod
+    def from_image(cls, image, image_size, palette=False, png_options=None):
+        '''Draw on an existing image, or None if its size or color mode differ.'''
+        if image.size != tuple(image_size) or image.mode != ('P' if palette else 'RGB'):
+            return None
+        backend = cls.__new__(cls)
+        DrawingBackend.__init__(backend, image_size)
+        backend.palette = palette
+        backend.png_options = png_options or dict()
+        backend.image = image
+        backend.draw = ImageDraw.Draw(image)
+        return backend
+
+class FrameBackend(PilBackend):
+    '''Raster drawing kept in memory as animation frames, so each frame starts from a copy of the last.'''
+
+    # Latest image saved under each name.
+    frames = dict()
+
+    def save(self, file_name):
+        '''Keep the image as the latest frame for the name.'''
+        type(self).frames[file_name] = self.image
+
+    @classmethod
+    def open(cls, file_name, image_size, palette=False, png_options=None):
+        '''Continue drawing on a copy of the latest frame, leaving that frame as it was.'''
+        if file_name not in cls.frames:
+            return None
+        load_pil()
+        return cls.from_image(cls.frames[file_name].copy(), image_size, palette, png_options)
+
+class SvgBackend(DrawingBackend):
+    '''Vector drawing, saved as SVG.'''
+
+    file_ext = '.svg'
+
+    # Style classes for the logical faces.
+    font_styles = {
+        'mono':  'font-family: Andale Mono, DejaVu Sans Mono, Liberation Mono, monospace',
+        'title': 'font-family: Andale Mono, DejaVu Sans Mono, Liberation Mono, monospace',
+        'bold':  'font-family: Courier New, DejaVu Sans Mono, Liberation Mono, monospace; font-weight: bold',
+        }
+
+    def __init__(self, image_size, palette=False, png_options=None):
+        '''Constructor.'''
+        super().__init__(image_size)
+        self.elements = list()
+
+    def text(self, xy, text, font, fill):
+        '''Draw text, placing the baseline about one ascent below the top.'''
+        PROFILER.count('draw.text')
+        self.elements.append(f'<text x="{xy[0]:g}" y="{xy[1] + 0.8 * font[1]:g}" class="{font[0]}" font-size="{font[1]}" fill="{fill}">{escape(text)}</text>')
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        '''Draw a rectangle between two corners, inclusive.'''
+        PROFILER.count('draw.rectangle')
+        x0, y0, x1, y1 = flatten_coords(xy)
+        stroke = f' stroke="{outline}" stroke-width="{width}"' if outline is not None else ''
+        self.elements.append(f'<rect x="{x0:g}" y="{y0:g}" width="{x1 - x0:g}" height="{y1 - y0:g}" fill="{fill or "none"}"{stroke}/>')
+
+    def line(self, xy, fill, width=1):
+        '''Draw a line through the points.'''
+        PROFILER.count('draw.line')
+        coords = flatten_coords(xy)
+        points = ' '.join(f'{x:g},{y:g}' for x, y in zip(coords[0::2], coords[1::2]))
+        self.elements.append(f'<polyline points="{points}" fill="none" stroke="{fill}" stroke-width="{width}"/>')
+
+    def copy(self, png_options=None):
+        '''Independent copy of the elements so far; SVG has no PNG options.'''
+        backend = type(self).__new__(type(self))
+        backend.__dict__.update(self.__dict__)
+        backend.elements = list(self.elements)
+        return backend
+
+    def save(self, file_name):
+        '''Write the SVG file.'''
+        width, height = self.image_size
+        with open(file_name, 'w') as dF:
+            dF.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" xml:space="preserve">\n')
+            dF.write('<style>' + ' '.join(f'.{x} {{ {y} }}' for x, y in type(self).font_styles.items()) + '</style>\n')
+            dF.write(f'<rect width="{width}" height="{height}" fill="white"/>\n')
+            dF.write('\n'.join(self.elements))
+            dF.write('\n</svg>\n')
+
+# Output formats and their drawing backends.
+BACKENDS = {'png': PilBackend, 'svg': SvgBackend}
+
+class RenderScheduler:
+    '''Threads that draw independent charts side by side and encode each page while the next one draws.'''
+
+    def __init__(self, workers=None):
+        '''Constructor. One worker, or profiling, runs everything in order on the calling thread.'''
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.draw_pool = None
+        self.encode_pool = None
+
+    def serial(self):
+        '''Run in order, so profiled phases don't overlap.'''
+        return self.workers < 2 or PROFILER.enabled
+
+    def run(self, tasks):
+        '''Call each task, the first on this thread and the rest in the pool, returning their results in order.'''
+        if self.serial():
+            return [x() for x in tasks]
+        if self.draw_pool is None: self.draw_pool = ThreadPoolExecutor(self.workers, thread_name_prefix='draw')
+        futures = [self.draw_pool.submit(x) for x in tasks[1:]]
+        results = [x() for x in tasks[:1]]
+        return results + [x.result() for x in futures]
+
+    def encode(self, canvas, file_name):
+        '''Save a canvas in the background; PIL releases the GIL while it compresses.'''
+        if self.serial():
+            future = Future()
+            with PROFILER.phase('encode'):
+                canvas.save(file_name)
+            future.set_result(file_name)
+            return future
+        if self.encode_pool is None: self.encode_pool = ThreadPoolExecutor(self.workers, thread_name_prefix='encode')
+        return self.encode_pool.submit(canvas.save, file_name)
+
+    @contextlib.contextmanager
+    def pipeline(self):
+        '''Save function that overlaps each page's encoding with drawing the next, keeping at most two pages in memory.'''
+        pending = list()
+        def save(canvas, file_name):
+            while pending: pending.pop().result()
+            pending.append(self.encode(canvas, file_name))
+        try:
+            yield save
+        finally:
+            while pending: pending.pop().result()
+
+# Process-wide render threads.
+RENDERER = RenderScheduler()
+
 class PlotScoutAdvancement:
 
     # Most recently exported file.
@@ -69,137 +1097,487 @@ class PlotScoutAdvancement:
             },
         }
 
-    def __init__(self, csv_file, obscure_names):
+    # Fill colors for where requirements can be done.
+    category_fills = {
+        'do at meetings': 'azure',
+        'do as homework': 'cornsilk',
+        'do on outings':  'lavenderblush',
+        }
+
+    # Most recently used blank checklist grids, keyed by backend, palette mode, size, columns and leader rows.
+    checklist_templates = dict()
+    checklist_template_count = 4
+
+    # Characters that fit on the checklist's event line.
+    event_name_len = 28
+
+    # Parsed model attributes kept in the snapshot cache.
+    snapshot_fields = ('data_dict', 'req_check', 'scout_names', 'scout_index', 'rank_indices',
+                       'max_name_len', 'max_rank_len', 'scout_order', 'version_reqs')
+
+    def __init__(self, csv_file, obscure_names, palette=False, png_options=None, page_size=None, output_format='png', scouts=None):
         '''Constructor.'''
 
         # Check the file.
         self.csv_file = csv_file
         self.obscure_names = obscure_names
+        self.scouts = tuple(scouts) if scouts else None
+        self.row_index = None
+        self.req_index = None
+        self.advancement_state = None
+        self.checklist_state = None
+        self.palette = palette
+        self.png_options = png_options or dict()
+        self.page_size = page_size
+        self.backend = BACKENDS[output_format]
         assert os.path.isfile(csv_file), \
             f'[ERROR] Can\'t find file "{self.csv_file}".'
 
         # Get the report date.
-        match = re.search('(?P<year>\d\d\d\d)(?P<month>\d\d)(?P<day>\d\d)', csv_file)
+        match = re.search(r'(?P<year>\d\d\d\d)(?P<month>\d\d)(?P<day>\d\d)', csv_file)
         assert match, \
             f'ERROR Couldn\'t get report date from "{csv_file}".'
         self.report_date = (match.group('year'), match.group('month'), match.group('day'))
 
+    def row_kinds(self):
+        '''Rows identified by their first cell.'''
+        row_kinds = {'DOB': ROW_DOB, 'Age': ROW_AGE, 'Current Rank': ROW_CURRENT_RANK}
+        row_kinds.update((x, ROW_RANK_STATUS) for x in type(self).rank_progression)
+        return row_kinds
+
+    def iter_rows(self):
+        '''Stream the CSV file as typed row events.'''
+
+        # Only the selected scouts' columns are kept when there is a selection.
+        if self.scouts:
+            yield from self.iter_selected_rows()
+            return
+
+        # Names are in the first line.
+        with open(self.csv_file, 'r', newline='') as dF:
+            rows = (x for x in csv.reader(dF) if x)
+            header_tokens = next(rows, None)
+            if header_tokens is None: return
+            PROFILER.count('rows')
+            yield RowEvent(ROW_HEADER, header_tokens[1:], None, None, None, None)
+            yield from self.classify_rows((x[0].strip(), lambda x=x: x[1:]) for x in rows)
+
+    def classify_rows(self, rows, skip_unused_versions=False):
+        '''Typed row events from (label, values function) pairs after the header, reading values only for rows that are kept.'''
+
+        # Rows identified by their first cell; everything else is a version or requirement row.
+        row_kinds = self.row_kinds()
+
+        # Requirement rows belong to the most recent version row.
+        scout_rank = None
+        req_version = None
+        skip_version = False
+        for row_label, row_values in rows:
+            PROFILER.count('rows')
+
+            # Fixed rows are looked up by label.
+            row_kind = row_kinds.get(row_label)
+            if row_kind == ROW_RANK_STATUS:
+                skip_version = False
+                yield RowEvent(row_kind, row_values(), row_label, None, None, None)
+                continue
+            elif row_kind is not None:
+                yield RowEvent(row_kind, row_values(), None, None, None, None)
+                continue
+
+            # Check for version line, optionally skipping versions nobody is working on.
+            PROFILER.count('regex.version')
+            match = VERSION_PATTERN.search(row_label)
+            if match:
+                scout_rank = match.group('rank')
+                req_version = match.group('version')
+                values = row_values()
+                skip_version = skip_unused_versions and not any(values)
+                if not skip_version: yield RowEvent(ROW_VERSION, values, scout_rank, req_version, None, None)
+                continue
+            if skip_version:
+                PROFILER.count('rows.skipped')
+                continue
+
+            # Check for requirement line.
+            PROFILER.count('regex.requirement')
+            match = REQ_PATTERN.match(row_label)
+            if match:
+                yield RowEvent(ROW_REQUIREMENT, row_values(), scout_rank, req_version, match.group('req'), row_label[match.end():])
+
+    def index_rows(self, mapped):
+        '''Byte range and first cell of every row, found without tokenizing the other columns.'''
+        row_index = list()
+        start = 0
+        while start < len(mapped):
+            end = mapped.find(b'\n', start)
+            end = len(mapped) if end < 0 else end + 1
+
+            # A newline inside a quoted cell continues the row.
+            while mapped[start:end].count(b'"') % 2 and end < len(mapped):
+                next_end = mapped.find(b'\n', end)
+                end = len(mapped) if next_end < 0 else next_end + 1
+            row_index.append((start, end, first_cell(mapped[start:end])))
+            start = end
+        return row_index
+
+    def iter_selected_rows(self):
+        '''Stream the selected scouts' columns from a memory map, skipping version sections none of them use.'''
+
+        def tokenize(start, end):
+            '''Tokenize the whole row, then keep the selected columns.'''
+            line_tokens = next(csv.reader([mapped[start:end].decode()]))
+            return [line_tokens[x] if x < len(line_tokens) else '' for x in columns]
+
+        with open(self.csv_file, 'rb') as dF:
+            file_stat = os.fstat(dF.fileno())
+            if file_stat.st_size == 0: return
+            with mmap.mmap(dF.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+
+                # Index the rows once per version of the file.
+                index_key = (file_stat.st_size, file_stat.st_mtime_ns)
+                if self.row_index is None or self.row_index[0] != index_key:
+                    with PROFILER.phase('index'):
+                        self.row_index = (index_key, self.index_rows(mapped))
+                row_index = self.row_index[1]
+
+                # Find the selected scouts' columns in the header.
+                header_tokens = next(csv.reader([mapped[row_index[0][0]:row_index[0][1]].decode()]))
+                name_columns = {normalize_name(x): index for index, x in enumerate(header_tokens) if index > 0}
+                missing_names = [x for x in self.scouts if normalize_name(x) not in name_columns]
+                assert not missing_names, \
+                    f'[ERROR] Scouts not in "{self.csv_file}": {", ".join(missing_names)}.'
+                columns = sorted({name_columns[normalize_name(x)] for x in self.scouts})
+                PROFILER.count('rows')
+                yield RowEvent(ROW_HEADER, [header_tokens[x] for x in columns], None, None, None, None)
+
+                # Rows are only tokenized when kept, and version sections none of the selected scouts use are skipped unread.
+                rows = ((x[2], functools.partial(tokenize, x[0], x[1])) for x in row_index[1:] if x[1] - x[0] > 2 or mapped[x[0]:x[1]].strip())
+                yield from self.classify_rows(rows, skip_unused_versions=True)
+
     # Assumes the CSV file was created with these options in ScoutBook.
-    def read_data(self):
-        '''Read the advancement CSV file.'''
+    @PROFILER.timed('read_data')
+    def read_data(self, cache=None):
+        '''Read the advancement CSV file, or its parsed snapshot from the cache.'''
+
+        # Use the cached snapshot if the file is unchanged.
+        if cache is not None:
+            cache_key = cache.key(self.csv_file, self.scouts, type(self).rank_progression)
+            with PROFILER.phase('cache_load'):
+                snapshot = cache.load(cache_key)
+            # A snapshot that doesn't restore is a miss, and is parsed again.
+            if snapshot is not None:
+                try:
+                    self.restore_snapshot(snapshot)
+                    PROFILER.count('scouts', len(self.scout_names))
+                    return
+                except Exception:
+                    cache.discard(cache_key)
 
         def capitalize_name(scout_name):
             '''Capitalize the first letter of name and lower-case other letters if preceeded by a letter.'''
             capitalized_name = ''
             for name_letter in scout_name:
-                if re.match('[a-zA-Z]', name_letter) and re.match('[a-zA-Z]', capitalized_name[-1:]):
+                if LETTER_PATTERN.match(name_letter) and LETTER_PATTERN.match(capitalized_name[-1:]):
                     capitalized_name += name_letter.lower()
                 else:
                     capitalized_name += name_letter.upper()
             return capitalized_name
 
+        def read_header(row):
+            '''Names are in the first line.'''
+            scout_names.extend(capitalize_name(x) for x in row.values)
+            for index, scout_name in enumerate(scout_names):
+                self.data_dict[scout_name] = dict()
+                header_index[scout_name] = index
+
+        def read_dob(row):
+            '''Date of birth is in the second line.'''
+            for scout_name, value in zip(scout_names, row.values):
+                self.data_dict[scout_name]['dob'] = value
+
+        def read_age(row):
+            '''Age is in the third line.'''
+            for scout_name, value in zip(scout_names, row.values):
+                self.data_dict[scout_name]['age'] = value
+                if int(value) >= 18: aged_out.add(scout_name)
+
+        def read_current_rank(row):
+            '''Current rank is in the fourth line.'''
+            for scout_name, value in zip(scout_names, row.values):
+                if   value.startswith('1st'): value = 'First Class'
+                elif value.startswith('2nd'): value = 'Second Class'
+                self.data_dict[scout_name]['rank'] = value
+                for scout_rank in type(self).rank_progression:
+                    self.data_dict[scout_name][scout_rank] = dict()
+
+                # Keep the rank index to color unrecorded requirements.
+                rank_index_cur = -1
+                if value:
+                    if value in ('Star', 'Life', 'Eagle'): value += ' Scout'
+                    rank_index_cur = type(self).rank_progression.index(value)
+                rank_indices[scout_name] = rank_index_cur
+
+        def read_rank_status(row):
+            '''Add the rank status.'''
+            for scout_name, value in zip(scout_names, row.values):
+                self.data_dict[scout_name][row.rank]['award'] = value
+
+        def read_version(row):
+            '''Process rank version requirements.'''
+            for scout_name, value in zip(scout_names, row.values):
+                if value:
+                    self.data_dict[scout_name][row.rank]['version'] = row.version
+
+        def read_requirement(row):
+            '''Keep the requirement row until the scouts' versions are known.'''
+            version_rows.setdefault(row.rank, dict()).setdefault(row.version, list()).append((row.req, row.values))
+            version_reqs.setdefault(row.rank, dict()).setdefault(row.version, dict())[row.req] = row.text
+
+            # Build database to check for requirement renames or additions across versions.
+            self.req_check.setdefault(row.rank, dict()).setdefault(row.req, list()).append(row.text)
+
+        # Dispatch table for the row events.
+        row_readers = {
+            ROW_HEADER:       read_header,
+            ROW_DOB:          read_dob,
+            ROW_AGE:          read_age,
+            ROW_CURRENT_RANK: read_current_rank,
+            ROW_RANK_STATUS:  read_rank_status,
+            ROW_VERSION:      read_version,
+            ROW_REQUIREMENT:  read_requirement,
+            }
+
         # Read in the data.
         aged_out = set()
-        scout_names = None
-        current_rank = None
+        scout_names = list()
+        header_index = dict()
+        rank_indices = dict()
+        version_rows = dict()
+        version_reqs = dict()
         self.data_dict = dict()
         self.req_check = dict()
-        with open(self.csv_file, 'r') as dF:
-            for index, line in enumerate(dF):
-                line_tokens = re.sub('"', '', line.strip()).split(',')
-
-                # Check for version line.
-                match_version_line = re.search('(?P<rank>.*) (?P<version>v\d\d\d\d)', line_tokens[0])
-                match_req_line = re.match('(?P<req>\d+[a-z]?)\.', line_tokens[0])
-
-                # Names are in the first line.
-                if index == 0:
-                    scout_names = [capitalize_name(x) for x in line_tokens[1:]]
-                    for scout_name in scout_names:
-                        self.data_dict[scout_name] = dict()
-
-                # Date of birth is in the second line.
-                elif line_tokens[0] == 'DOB':
-                    for index, scout_name in enumerate(scout_names):
-                        self.data_dict[scout_name]['dob'] = line_tokens[index + 1]
-
-                # Age is in the third line.
-                elif line_tokens[0] == 'Age':
-                    for index, scout_name in enumerate(scout_names):
-                        self.data_dict[scout_name]['age'] = line_tokens[index + 1]
-                        if int(self.data_dict[scout_name]['age']) >= 18: aged_out.add(scout_name)
-
-                # Current rank is in the fourth line.
-                elif line_tokens[0] == 'Current Rank':
-                    for index, scout_name in enumerate(scout_names):
-                        if   re.match('1st', line_tokens[index + 1]): line_tokens[index + 1] = 'First Class'
-                        elif re.match('2nd', line_tokens[index + 1]): line_tokens[index + 1] = 'Second Class'
-                        self.data_dict[scout_name]['rank'] = line_tokens[index + 1]
-                        for scout_rank in type(self).rank_progression:
-                            self.data_dict[scout_name][scout_rank] = dict()
-
-                # Add the rank status.
-                elif line_tokens[0] in type(self).rank_progression:
-                    for index, scout_name in enumerate(scout_names):
-                        self.data_dict[scout_name][line_tokens[0]]['award'] = line_tokens[index + 1]
-
-                # Process rank version requirements.
-                elif match_version_line:
-                    scout_rank = match_version_line.group('rank')
-                    req_version = match_version_line.group('version')
-                    for index, scout_name in enumerate(scout_names):
-                        if line_tokens[index + 1]:
-                            self.data_dict[scout_name][scout_rank]['version'] = req_version
-                            self.data_dict[scout_name][scout_rank]['reqs'] = list()
-
-                # Add the requirement.
-                elif match_req_line:
-
-                    # To color unrecorded requirements.
-                    rank_index = type(self).rank_progression.index(scout_rank)
-
-                    # Add the requirement if the versions match.
-                    for index, scout_name in enumerate(scout_names):
-                        if 'version' in self.data_dict[scout_name][scout_rank] and \
-                           self.data_dict[scout_name][scout_rank]['version'] == req_version:
-                            req_status = [match_req_line.group('req'), line_tokens[index + 1]]
-
-                            # Update requirement status if not recorded but rank awarded.
-                            rank_index_cur = 0
-                            if self.data_dict[scout_name]['rank']:
-                                rank_name = self.data_dict[scout_name]['rank']
-                                if rank_name in ('Star', 'Life', 'Eagle'): rank_name += ' Scout'
-                                rank_index_cur = type(self).rank_progression.index(rank_name)
-                            if rank_index < rank_index_cur and not req_status[1]:
-                                req_status[1] = True
-                            self.data_dict[scout_name][scout_rank]['reqs'].append(req_status)
-
-                    # Build database to check for requirement renames or additions across versions.
-                    if scout_rank not in self.req_check:
-                        self.req_check[scout_rank] = dict()
-                    if req_status[0] not in self.req_check[scout_rank]:
-                        self.req_check[scout_rank][req_status[0]] = list()
-                    self.req_check[scout_rank][req_status[0]].append(re.sub(req_status[0] + '\. ', '', line_tokens[0].strip()))
+        with PROFILER.phase('parse'):
+            for row in self.iter_rows():
+                row_readers[row.kind](row)
 
         # Remove scouts that have aged out.
         for scout_name in aged_out:
             del self.data_dict[scout_name]
 
+        # Build the requirement matrices with columns for the scouts that remain.
+        with PROFILER.phase('matrices'):
+            self.scout_names = tuple(self.data_dict)
+            self.scout_index = {x: index for index, x in enumerate(self.scout_names)}
+            self.rank_indices = np.array([rank_indices[x] for x in self.scout_names], dtype=int)
+            header_columns = np.array([header_index[x] for x in self.scout_names], dtype=int)
+            self.req_matrix = dict()
+            for rank_index, scout_rank in enumerate(type(self).rank_progression):
+                rank_rows = version_rows.get(scout_rank, dict())
+                versions = np.array([self.data_dict[x][scout_rank].get('version', '') for x in self.scout_names], dtype=object)
+                awards = np.array([self.data_dict[x][scout_rank].get('award', '') for x in self.scout_names], dtype=object)
+                reqs = {req for req_rows in rank_rows.values() for req, _ in req_rows}
+                self.req_matrix[scout_rank] = RankMatrix(reqs, versions, awards)
+
+                # Requirements are complete if recorded or if the scout is past the rank.
+                backfill = rank_index < self.rank_indices
+                for req_version, req_rows in rank_rows.items():
+                    scout_mask = versions == req_version
+                    for req, values in req_rows:
+                        statuses = np.array(values, dtype=object)[header_columns]
+                        self.req_matrix[scout_rank].set_column(req, scout_mask, statuses, backfill)
+
+            # Look up columns, positions, categories and durations once for all consumers.
+            self.version_reqs = {x: {y: tuple(z) for y, z in rank_versions.items()} for x, rank_versions in version_reqs.items()}
+            self.catalog = self.build_catalog()
+
         # Get maximum widths.
         self.max_name_len = max([len(x) for x in self.data_dict])
         self.max_rank_len = max([len(x) for x in type(self).rank_progression])
 
         # Check for missing data.
 
-        # Get scout rank order from number of completed requirements.
-        rank_req_complete = dict()
+        # Get scout rank order from number of completed requirements, ties by name.
+        with PROFILER.phase('ranking'):
+            rank_req_complete = sum(x.done_counts() for x in self.req_matrix.values())
+            name_order = np.argsort(np.array(self.scout_names, dtype=str), kind='stable')
+            rank_order = name_order[np.argsort(-rank_req_complete[name_order], kind='stable')]
+            self.scout_order = tuple(self.scout_names[x] for x in rank_order)
+        PROFILER.count('scouts', len(self.scout_names))
+
+        # Cache the parsed model.
+        if cache is not None:
+            with PROFILER.phase('cache_store'):
+                cache.store(cache_key, self.snapshot())
+
+    def snapshot(self):
+        '''Parsed model as plain data for the snapshot cache.'''
+        snapshot = {x: getattr(self, x) for x in type(self).snapshot_fields}
+        snapshot['req_matrix'] = {x: y.to_state() for x, y in self.req_matrix.items()}
+        return snapshot
+
+    def restore_snapshot(self, snapshot):
+        '''Restore the parsed model from the snapshot cache.'''
+        for field_name in type(self).snapshot_fields:
+            setattr(self, field_name, snapshot[field_name])
+        self.req_matrix = {x: RankMatrix.from_state(y) for x, y in snapshot['req_matrix'].items()}
+        self.catalog = self.build_catalog()
+
+    def build_catalog(self):
+        '''Catalog from the parsed requirements and the current category and duration tables, which aren't cached.'''
+        return RequirementCatalog(self.req_matrix, self.version_reqs, type(self).do_req_where, type(self).req_min_durations)
+
+    def scout_record(self, scout_name):
+        '''Everything parsed for one scout, in a form that compares equal when unchanged.'''
+        scout_index = self.scout_index[scout_name]
+        rank_records = list()
+        for scout_rank, rank_matrix in self.req_matrix.items():
+            present = rank_matrix.present[scout_index]
+            rank_records.append((scout_rank, rank_matrix.versions[scout_index], rank_matrix.awards[scout_index],
+                                 tuple(rank_matrix.req_array[present]), tuple(rank_matrix.done[scout_index][present]), tuple(rank_matrix.dates[scout_index][present])))
+        scout_data = self.data_dict[scout_name]
+        return (scout_data['dob'], scout_data['age'], scout_data['rank'], tuple(rank_records))
+
+    def changed_scouts(self, previous):
+        '''Scouts added, removed or changed since a previous parse.'''
+        changed = set(self.scout_names) ^ set(previous.scout_names)
+        for scout_name in set(self.scout_names) & set(previous.scout_names):
+            if self.scout_record(scout_name) != previous.scout_record(scout_name): changed.add(scout_name)
+        return sorted(changed)
+
+    def requirement_index(self):
+        '''Inverted index of the scouts missing each requirement, built once per parse.'''
+        if self.req_index is None or self.req_index.scout_names is not self.scout_names:
+            self.req_index = RequirementIndex(self.req_matrix, self.catalog, self.scout_names, self.scout_order)
+        return self.req_index
+
+    def match_categories(self, where):
+        '''Categories whose name contains the text, e.g. "meetings".'''
+        categories = tuple(x for x in self.catalog.categories if where.lower() in x)
+        assert categories, \
+            f'[ERROR] Unknown category "{where}", use one of: {", ".join(self.catalog.categories)}.'
+        return categories
+
+    def print_query(self, query_spec=None, where=None):
+        '''Print the scouts still needing the requirements that match "<rank> [<requirement>]" and where they can be done.'''
+
+        # Split the rank and requirement, and match the category by any part of its name.
+        scout_rank, req = None, None
+        if query_spec:
+            match = re.fullmatch(r'(?P<rank>.*?)\s*(?P<req>\b\d+[a-z]?)?', query_spec.strip())
+            scout_rank = match.group('rank') or None
+            req = match.group('req')
+            ranks = [x for x in type(self).rank_progression if scout_rank is None or x.lower().startswith(scout_rank.lower())]
+            assert ranks, \
+                f'[ERROR] Unknown rank "{scout_rank}".'
+            scout_rank = ranks[0] if scout_rank else None
+        category = self.match_categories(where)[0] if where else None
+
+        # Print each requirement with the scouts that still need it.
+        req_index = self.requirement_index()
+        order_names = {x: f'SCOUT NAME {index}' for index, x in enumerate(self.scout_order)}
+        for result_rank, result_req, scout_names in req_index.query(scout_rank, req, category):
+            if self.obscure_names: scout_names = [order_names[x] for x in scout_names]
+            result_category = self.catalog.category(result_rank, self.catalog.columns[result_rank][result_req]) or 'anywhere'
+            print(f'{result_rank} {result_req} ({result_category}, {len(scout_names)}): {", ".join(scout_names)}')
+
+    @PROFILER.timed('plan_topics')
+    def plan_topics(self, topic_count, where=None):
+        '''Choose topics for the next meetings or outings, printing each with the scouts it covers.'''
+        categories = self.match_categories(where) if where else ('do at meetings', 'do on outings')
+        planner = MeetingPlanner(self.req_matrix, self.catalog, self.rank_indices, self.eagle_deadlines(), categories)
+        order_positions = {x: index for index, x in enumerate(self.scout_order)}
+        for index, (scout_rank, req, scout_indices, score) in enumerate(planner.plan(topic_count)):
+            scout_names = sorted((self.scout_names[x] for x in scout_indices), key=order_positions.get)
+            if self.obscure_names: scout_names = [f'SCOUT NAME {order_positions[x]}' for x in scout_names]
+            req_text = self.req_check[scout_rank][req][-1].strip() if scout_rank in self.req_check and req in self.req_check[scout_rank] else ''
+            print(f'{index + 1}. {scout_rank} {req} ({len(scout_names)} scouts, score {score:.1f}): {req_text}')
+            print(f'     {", ".join(scout_names)}')
+
+    @PROFILER.timed('eagle_deadlines')
+    def eagle_deadlines(self, now=None):
+        '''Compute the Eagle deadlines for all scouts without rendering.'''
+        dobs = [self.data_dict[x]['dob'] for x in self.scout_names]
+        return EagleDeadlines(self.req_matrix, self.rank_indices, dobs, self.catalog, now)
+
+    def page_starts(self, row_count):
+        '''First row of each page, or a single page without pagination.'''
+        if not self.page_size:
+            return [0]
+        return list(range(0, max(row_count, 1), self.page_size))
+
+    def page_names(self, image_name, page_count):
+        '''Use the backend's file extension and number the output files when there is more than one page.'''
+        image_root = os.path.splitext(image_name)[0]
+        image_ext = self.backend.file_ext
+        if page_count == 1:
+            return [image_root + image_ext]
+        return [f'{image_root}_p{x + 1:02d}{image_ext}' for x in range(page_count)]
+
+    def new_canvas(self, image_size):
+        '''Start a drawing with the configured backend.'''
+        return self.backend(image_size, self.palette, self.png_options)
+
+    # Columns for the CSV export, with four per rank.
+    export_fields = ('name', 'dob', 'age', 'rank', 'eagle_status', 'eagle_by', 'eagle_days_left')
+    export_rank_fields = ('version', 'award_date', 'done', 'remaining')
+
+    def iter_scout_records(self):
+        '''Yield one record per scout, by name, with the ranks, requirements and Eagle deadline.'''
+
+        # Completed requirements include everything in an awarded rank.
+        rank_done = {x: y.present & (y.done | y.awarded[:, None]) for x, y in self.req_matrix.items()}
+        rank_remain = {x: y.remaining() for x, y in self.req_matrix.items()}
+        eagle_deadlines = self.eagle_deadlines()
+
+        # Build each record only when it is asked for.
         for scout_name in sorted(self.data_dict):
-            rank_req_complete[scout_name] = 0
+            scout_index = self.scout_index[scout_name]
+            ranks = list()
             for scout_rank in type(self).rank_progression:
-                for req_spec in self.data_dict[scout_name][scout_rank]['reqs']:
-                    if req_spec[1]: rank_req_complete[scout_name] += 1
-        self.scout_order = tuple(x for x in sorted(rank_req_complete, reverse=True, key=lambda x:rank_req_complete[x]))
-
+                rank_matrix = self.req_matrix[scout_rank]
+                award = rank_matrix.awards[scout_index] if rank_matrix.awarded[scout_index] else None
+                ranks.append({
+                    'rank':       scout_rank,
+                    'version':    rank_matrix.versions[scout_index] or None,
+                    'award':      award,
+                    'award_date': iso_date(award) if award else None,
+                    'done':       rank_matrix.req_array[rank_done[scout_rank][scout_index]].tolist(),
+                    'remaining':  rank_matrix.req_array[rank_remain[scout_rank][scout_index]].tolist(),
+                    })
+            yield {
+                'name':  scout_name,
+                'dob':   self.data_dict[scout_name]['dob'],
+                'age':   int(self.data_dict[scout_name]['age']),
+                'rank':  self.data_dict[scout_name]['rank'],
+                'ranks': ranks,
+                'eagle': {
+                    'status':    'Complete' if eagle_deadlines.complete[scout_index] else 'Advance',
+                    'by':        str(eagle_deadlines.advance_by[scout_index]),
+                    'days_left': int(eagle_deadlines.days_left[scout_index]),
+                    },
+                }
+
+    @PROFILER.timed('export_records')
+    def export_records(self, file_name, export_format=None):
+        '''Stream the scout records to a JSON lines or CSV file, or stdout for "-".'''
+        export_format = export_format or ('csv' if file_name.endswith('.csv') else 'jsonl')
+        with (contextlib.nullcontext(sys.stdout) if file_name == '-' else open(file_name, 'w', newline='', buffering=1 << 16)) as dF:
+            if export_format == 'jsonl':
+                for record in self.iter_scout_records():
+                    dF.write(json.dumps(record) + '\n')
+                return
+
+            # One CSV row per scout, with requirement lists joined by spaces.
+            writer = csv.writer(dF)
+            writer.writerow(list(type(self).export_fields) + [f'{x} {y}' for x in type(self).rank_progression for y in type(self).export_rank_fields])
+            for record in self.iter_scout_records():
+                row = [record['name'], record['dob'], record['age'], record['rank'], record['eagle']['status'], record['eagle']['by'], record['eagle']['days_left']]
+                for rank_record in record['ranks']:
+                    row += [rank_record['version'] or '', rank_record['award_date'] or '', ' '.join(rank_record['done']), ' '.join(rank_record['remaining'])]
+                writer.writerow(row)
+
+    @PROFILER.timed('dump_data')
     def dump_data(self):
         '''Dump the database.'''
 
@@ -210,37 +1588,22 @@ class PlotScoutAdvancement:
         #        if len(set(self.req_check[scout_rank][req])) > 1 or len(self.req_check[scout_rank][req]) in (0, 1):
         #            print(' ', req, self.req_check[scout_rank][req])
 
-        # Print the data.
-        for scout_name in sorted(self.data_dict):
-            print(f'Scout: {scout_name}, {self.data_dict[scout_name]["age"]}, {self.data_dict[scout_name]["dob"]}:')
-            print(f'  Current Rank: {self.data_dict[scout_name]["rank"]}')
-            for scout_rank in type(self).rank_progression:
+        # Print the data, one write per scout.
+        for record in self.iter_scout_records():
+            scout_lines = [f'Scout: {record["name"]}, {record["age"]}, {record["dob"]}:', f'  Current Rank: {record["rank"]}']
+            for rank_record in record['ranks']:
+
+                # Add the rank requirements version and when rank was awarded.
                 rank_data = list()
                 rank_data_str = ''
-                rank_award = False
-
-                # Create string for rank requirements version.
-                if self.data_dict[scout_name][scout_rank]:
-                    rank_data.append(f'{self.data_dict[scout_name][scout_rank]["version"]}')
-
-                # Create string for when rank was awarded.
-                if 'award' in self.data_dict[scout_name][scout_rank] and \
-                   re.match('\d+/\d+/\d+', self.data_dict[scout_name][scout_rank]['award']):
-                    rank_data.append(f'completed {self.data_dict[scout_name][scout_rank]["award"]}')
-                    rank_award = True
-
-                # Print the rank and requirements.
+                if rank_record['version']: rank_data.append(rank_record['version'])
+                if rank_record['award']: rank_data.append(f'completed {rank_record["award"]}')
                 if rank_data: rank_data_str = ' (' + ', '.join(rank_data) + ')'
-                print(f'  {scout_rank} Requirements{rank_data_str}:')
+                scout_lines.append(f'  {rank_record["rank"]} Requirements{rank_data_str}:')
 
-                # Print the individual requirements.
-                req_specs = (x for x in sorted(self.data_dict[scout_name][scout_rank]['reqs'], key=lambda x:int(re.sub('[a-z]*', '', x[0]))))
-                reqs_done = list()
-                reqs_remain = list()
-                for req_spec in req_specs:
-                    if rank_award or req_spec[1]: reqs_done.append(req_spec[0])
-                    else:                         reqs_remain.append(req_spec[0])
-                print(f'    ', ', '.join(reqs_done), ' | ', ', '.join(reqs_remain))
+                # Add the individual requirements, already sorted by number.
+                scout_lines.append(f'     {", ".join(rank_record["done"])}  |  {", ".join(rank_record["remaining"])}')
+            print('\n'.join(scout_lines))
 
     # Plot characteristics.
     #   - Since everyone's 18th birthday is different, draw a timeline for each scout working back from Eagle.
@@ -256,191 +1619,196 @@ class PlotScoutAdvancement:
     #                      First Class for Eagle -------------------------------------------'    |     |
     #                       Star Scout for Eagle ------------------------------------------------'     |
     #                       Life Scout for Eagle ------------------------------------------------------'
-    def plot_advancement(self):
-        '''Plot the advancement data.'''
-
-
-        # Get minimum number of days.
-        min_rank_times = dict()
-        rank_req_count = dict()
-        for scout_name in sorted(self.scout_order):
+    @PROFILER.timed('plot_advancement')
+    def plot_advancement(self, image_name='scout_advancement.png', previous_state=None, row_names=None):
+        '''Plot the advancement data, redrawing only changed rows of a previous render with the same layout.
+        Rows are in chart order unless given, where None leaves a blank row.'''
 
-            # Get the rank advancement information.
-            for scout_rank in type(self).rank_progression:
-
-                # Initialize time to zero.
-                rank_time = 0
-
-                # Add rank times.
-                for req_spec in self.data_dict[scout_name][scout_rank]['reqs']:
-                    if req_spec[0] in type(self).req_min_durations[scout_rank]:
-                        rank_time += type(self).req_min_durations[scout_rank][req_spec[0]]
-                    elif not re.search(' Scout', scout_rank):
-                        rank_time += 1
 
-                # Add the time. Notes that some versions have more requirements than others.
-                if scout_rank not in min_rank_times or rank_time > min_rank_times[scout_rank]:
-                    min_rank_times[scout_rank] = rank_time
+        # Column counts with requirements aligned across versions.
+        rank_req_count = self.catalog.widths
+        eagle_deadlines = self.eagle_deadlines()
 
-                # Count the requirements.
-                req_count = len(self.data_dict[scout_name][scout_rank]['reqs'])
-                if scout_rank not in rank_req_count or req_count > rank_req_count[scout_rank]:
-                    rank_req_count[scout_rank] = req_count
-
-        # Start the plot.
+        # Start the plot. Widths come from the whole roster so pages line up.
         margin_pix = 60
         line_pix = 20
         req_pix = 15
         rank_width = self.max_rank_len * 12
         name_width = self.max_name_len * 12
-        height = 4 * margin_pix + 3 * line_pix * len(self.scout_order)
         width = 2 * margin_pix + name_width + (rank_req_count['Second Class'] + rank_req_count['First Class']) * req_pix
-        image_size = (width, height)
 
         # Set up fonts.
-        title_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Andale Mono.ttf', 24)
-        line_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Andale Mono.ttf', 16)
-        rank_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Courier New Bold.ttf', 14)
-        req_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Andale Mono.ttf', 10)
-
-        def plot_rank_col(scout_rank, row_offset, col_offset):
-            '''Plot the rank column with complete or incomplete requirements.'''
-
-            # Print the rank.
-            draw_image.text((col_offset, row_offset - 20), scout_rank, font=rank_font, fill='black')
-
-            # Print the requirements.
-            for index_scout, scout_name in enumerate(self.scout_order):
-
-                # Sort the requirements by number first.
-                req_specs = (x for x in sorted(self.data_dict[scout_name][scout_rank]['reqs'], key=lambda x:int(re.sub('[a-z]*', '', x[0]))))
-
-                # Loop on requirements.
-                for index_req, req_spec in enumerate(req_specs):
-                    req_offset = (col_offset + index_req * req_pix, row_offset + index_scout * line_pix)
-
-                    # Color the requirement if it is awarded or scout is past that rank or is time limiting.
-                    fill_color = None
-                    outline_color = None
-                    if self.data_dict[scout_name][scout_rank]['reqs'][index_req][1]: fill_color = 'palegreen'
- 
-                    # If the requirement is not completed, add other colors or outlines.
-                    else:
-
-                        # Colorize requirements for where they can be done.
-                        if   req_spec[0] in type(self).do_req_where['do at meetings'][scout_rank]: fill_color = 'azure'
-                        elif req_spec[0] in type(self).do_req_where['do as homework'][scout_rank]: fill_color = 'cornsilk'
-                        elif req_spec[0] in type(self).do_req_where['do on outings'][scout_rank]:  fill_color = 'lavenderblush'
-
-                        # Outline requirements that have time durations.
-                        if req_spec[0] in type(self).req_min_durations[scout_rank]: outline_color = 'red'
-
-                    # Add fill and outline.
-                    if fill_color is not None:
-                        draw_image.rectangle((req_offset, (req_offset[0] + req_pix - 1, req_offset[1] + req_pix)), fill=fill_color, outline=outline_color)
-
-                    # Add requirement reference.
-                    draw_image.text((req_offset[0] + 1, req_offset[1] + 1), f'{req_spec[0]:>2s}', font=req_font, fill='black')
-
-            # Calculate the column width.
-            col_width = max(req_pix * rank_req_count[scout_rank], len(scout_rank) * 12) + 10
-            return col_width
-
-        # Create the image.
-        image = Image.new('RGB', image_size, 'white')
-        draw_image = ImageDraw.Draw(image)
-
-        # Add the title.
-        title_text = f'Scout Advancement and Eagle Timeline ({self.report_date[1]}/{self.report_date[2]}/{self.report_date[0]})'
-        draw_image.text((2 * margin_pix, margin_pix // 3), title_text, font=title_font, fill='black')
-
-        # Add the scout names and current rank.
-        col_offset = margin_pix
-        row_offset = 1.5 * margin_pix
-        for index, scout_name in enumerate(self.scout_order):
-            draw_image.text((col_offset + name_width, row_offset + index * line_pix), self.data_dict[scout_name]['rank'], font=line_font, fill='black')
-            if self.obscure_names: scout_name = f'SCOUT NAME {index}'
-            draw_image.text((col_offset, row_offset + index * line_pix), scout_name, font=line_font, fill='black')
-        col_offset += name_width + rank_width
-
-        # Add the ranks.
+        title_font = ('title', 24)
+        line_font = ('mono', 16)
+        rank_font = ('bold', 14)
+        req_font = ('mono', 10)
+
+        # Rank columns go in three bands, each starting with the scout names, then the Eagle deadlines.
+        rank_cols = list()
+        band_ends = list()
+        band_index = 0
+        col_offset = margin_pix + name_width + rank_width
         for scout_rank in type(self).rank_progression:
-
-            # Reset the row and add names agein.
             if scout_rank in ('Second Class', 'Star Scout'):
+                band_ends.append(col_offset)
+                band_index += 1
+                col_offset = margin_pix + name_width
+            rank_cols.append((scout_rank, band_index, col_offset))
+            col_offset += max(req_pix * rank_req_count[scout_rank], len(scout_rank) * 12) + 10
+        eagle_offset = col_offset
+
+        # Colorize requirements for where they can be done and outline those that have time durations.
+        req_fills = dict()
+        req_outlines = dict()
+        for scout_rank in type(self).rank_progression:
+            req_fills[scout_rank] = [type(self).category_fills.get(self.catalog.category(scout_rank, x)) for x in range(len(self.req_matrix[scout_rank].reqs))]
+            req_outlines[scout_rank] = ['red' if x > 0 else None for x in self.catalog.min_days[scout_rank]]
+
+        def rank_cells(scout_rank, scout_index):
+            '''Aligned position, label, fill and outline of each requirement cell for one scout.'''
+            rank_matrix = self.req_matrix[scout_rank]
+            req_positions = self.catalog.positions[scout_rank]
+            cells = list()
+            for req_col in np.flatnonzero(rank_matrix.present[scout_index]):
+
+                # Color the requirement if it is awarded or scout is past that rank, otherwise where it can be done.
+                if rank_matrix.done[scout_index, req_col]:
+                    cells.append((int(req_positions[req_col]), rank_matrix.reqs[req_col], 'palegreen', None))
+                else:
+                    cells.append((int(req_positions[req_col]), rank_matrix.reqs[req_col], req_fills[scout_rank][req_col], req_outlines[scout_rank][req_col]))
+            return tuple(cells)
+
+        def row_content(scout_name, row_number):
+            '''Everything drawn on one scout's row, to plot it and to compare with a previous render.'''
+            if scout_name is None:
+                return ('', '', tuple(() for _ in type(self).rank_progression), '')
+            scout_index = self.scout_index[scout_name]
+            display_name = f'SCOUT NAME {row_number}' if self.obscure_names else scout_name
+            return (display_name, self.data_dict[scout_name]['rank'],
+                    tuple(rank_cells(x, scout_index) for x in type(self).rank_progression),
+                    eagle_deadlines.eagle_text(scout_index))
+
+        def plot_row(canvas, band_offsets, index, content):
+            '''Plot one scout's row in each band.'''
+            display_name, current_rank, cells, eagle_str = content
+
+            # Add the scout name to each band and the current rank to the first.
+            for band_offset in band_offsets:
+                canvas.text((margin_pix, band_offset + index * line_pix), display_name, line_font, 'black')
+            canvas.text((margin_pix + name_width, band_offsets[0] + index * line_pix), current_rank, line_font, 'black')
+
+            # Add fill, outline and requirement reference in the aligned columns.
+            for (scout_rank, band_index, col_offset), rank_cells in zip(rank_cols, cells):
+                for req_position, req, fill_color, outline_color in rank_cells:
+                    req_offset = (col_offset + req_position * req_pix, band_offsets[band_index] + index * line_pix)
+                    canvas.cell(req_offset, f'{req:>2s}', req_font, req_pix, fill_color, outline_color)
+
+            # Add the number of days until Eagle is impossible.
+            canvas.text((eagle_offset, band_offsets[-1] + index * line_pix), eagle_str, req_font, 'red')
+
+        def plot_frame(canvas, band_offsets, legend_box, title_text):
+            '''Plot the title, column headings and legend.'''
+            canvas.text((2 * margin_pix, margin_pix // 3), title_text, title_font, 'black')
+            for scout_rank, band_index, col_offset in rank_cols:
+                canvas.text((col_offset, band_offsets[band_index] - 20), scout_rank, rank_font, 'black')
+            canvas.text((eagle_offset, band_offsets[-1] - 20), 'Eagle is Impossible Unless', rank_font, 'black')
+
+            # Add color legend.
+            legend_x, legend_y = legend_box[:2]
+            canvas.rectangle(legend_box, width=2, outline='black')
+            x_off, y_off = legend_x + 15, legend_y + 15
+            for row_off in range(4):
+                fill_color, outline_color, row_text = {
+                    0: ('azure',         'black', 'Do at Meetings'),
+                    1: ('cornsilk',      'black', 'Do as Homework'),
+                    2: ('lavenderblush', 'black', 'Do on Outings'),
+                    3: (None,            'red',   'Has Time Requirement')
+                    }[row_off]
+                canvas.rectangle((x_off, y_off, x_off + 20, y_off + 20), fill=fill_color, outline=outline_color)
+                canvas.text((x_off + 30, y_off), row_text, rank_font, 'black')
+                y_off += 25
+
+        def clear_extents(dirty_rows, band_offsets, legend_box, page_band_ends):
+            '''Right edge to clear for each dirty row in each band, or None if a row reaches under the legend.'''
+            clear_ends = dict()
+            for index in dirty_rows:
+                for band_index, band_offset in enumerate(band_offsets):
+                    beside_legend = band_offset + index * line_pix <= legend_box[3] and band_offset + (index + 1) * line_pix > legend_box[1]
+                    if beside_legend and page_band_ends[band_index] >= legend_box[0] - 1: return None
+                    clear_ends[(index, band_index)] = legend_box[0] - 1 if beside_legend else width - 1
+            return clear_ends
+
+        # Render and save each page in turn so only one page is in memory.
+        row_names = self.scout_order if row_names is None else tuple(row_names)
+        page_starts = self.page_starts(len(row_names))
+        page_names = self.page_names(image_name, len(page_starts))
+        self.advancement_state = {'layout': (width, tuple(rank_cols), page_starts, self.page_size, self.backend.file_ext, self.palette), 'pages': dict()}
+        with RENDERER.pipeline() as save_page:
+            for page_index, (page_start, page_name) in enumerate(zip(page_starts, page_names)):
+                page_scouts = row_names[page_start:page_start + (self.page_size or len(row_names))]
+                height = 4 * margin_pix + 3 * line_pix * len(page_scouts)
+                image_size = (width, height)
+                legend_box = (width - 5 * margin_pix, height - 3 * margin_pix, width - margin_pix, height - margin_pix)
+
+                # Rows start below the title, and each band starts below the one before.
+                band_offsets = [1.5 * margin_pix]
+                for _ in range(2):
+                    band_offsets.append(band_offsets[-1] + margin_pix // 2 + len(page_scouts) * line_pix)
+
+                # Add the title.
+                title_text = f'Scout Advancement and Eagle Timeline ({self.report_date[1]}/{self.report_date[2]}/{self.report_date[0]})'
+                if len(page_names) > 1: title_text += f' - Page {page_index + 1} of {len(page_names)}'
+                rows = tuple(row_content(x, page_start + index) for index, x in enumerate(page_scouts))
+                page_state = {'title': title_text, 'rows': rows}
+                self.advancement_state['pages'][page_name] = page_state
+
+                # Reuse the previous image if the layout is the same, redrawing only the rows that changed.
+                canvas = None
+                if previous_state and previous_state['layout'] == self.advancement_state['layout'] and page_name in previous_state['pages']:
+                    previous_page = previous_state['pages'][page_name]
+                    dirty_rows = [x for x, y in enumerate(rows) if x >= len(previous_page['rows']) or previous_page['rows'][x] != y]
+                    dirty_title = previous_page['title'] != title_text
+                    if len(previous_page['rows']) == len(rows) and not dirty_rows and not dirty_title and os.path.isfile(page_name):
+                        PROFILER.count('pages.unchanged')
+                        continue
+
+                    # Rows beside the legend are cleared up to it, unless they reach under it.
+                    page_band_ends = band_ends + [eagle_offset + max([FONTS.font(*req_font).getlength(x[3]) for x in rows], default=0)]
+                    clear_ends = clear_extents(dirty_rows, band_offsets, legend_box, page_band_ends)
+                    if len(previous_page['rows']) == len(rows) and clear_ends is not None:
+                        canvas = self.backend.open(page_name, image_size, self.palette, self.png_options)
+
+                # Clear and plot the dirty rows and the title on the previous image.
+                if canvas is not None:
+                    PROFILER.count('rows.redrawn', len(dirty_rows))
+                    if dirty_title:
+                        canvas.rectangle((0, 0, width - 1, band_offsets[0] - 21), fill='white')
+                        canvas.text((2 * margin_pix, margin_pix // 3), title_text, title_font, 'black')
+                    for index in dirty_rows:
+                        for band_index, band_offset in enumerate(band_offsets):
+                            canvas.rectangle((0, band_offset + index * line_pix, clear_ends[(index, band_index)], band_offset + (index + 1) * line_pix - 1), fill='white')
+                        plot_row(canvas, band_offsets, index, rows[index])
+
+                # Otherwise plot the whole page.
+                else:
+                    canvas = self.new_canvas(image_size)
+                    for index, content in enumerate(rows):
+                        plot_row(canvas, band_offsets, index, content)
+                    plot_frame(canvas, band_offsets, legend_box, title_text)
 
-                # Reset the offsets.
-                col_offset = margin_pix
-                row_offset += margin_pix // 2 + len(self.scout_order) * line_pix
-
-                # Add the names back.
-                for index, scout_name in enumerate(self.scout_order):
-                    if self.obscure_names: scout_name = f'SCOUT NAME {index}'
-                    draw_image.text((col_offset, row_offset + index * line_pix), scout_name, font=line_font, fill='black')
-                col_offset += name_width
-
-            # Add the rank.
-            col_offset += plot_rank_col(scout_rank, row_offset, col_offset)
-
-        # Add the number of days until Eagle is impossible.
-        draw_image.text((col_offset, row_offset - 20), 'Eagle is Impossible Unless', font=rank_font, fill='black')
-        for index, scout_name in enumerate(self.scout_order):
-            remain_rank_days = 0
-
-            # Skip the rank they're currently working on.
-            current_rank = self.data_dict[scout_name]['rank']
-            if current_rank in ('Star', 'Life', 'Eagle'): current_rank += ' Scout'
-            rank_index = 0
-            if current_rank in type(self).rank_progression:
-                rank_index = type(self).rank_progression.index(current_rank) + 1
-            next_rank = type(self).rank_progression[rank_index]
-
-            # Add days for requirements not completed.
-            for scout_rank in type(self).rank_progression:
-                if scout_rank == next_rank: continue
-                for req_spec in self.data_dict[scout_name][scout_rank]['reqs']:
-                    if not req_spec[1] and req_spec[0] in type(self).req_min_durations[scout_rank]:
-                        remain_rank_days += type(self).req_min_durations[scout_rank][req_spec[0]]
-
-            # Subtract from 18th birthday.
-            dob_list = [int(x) for x in self.data_dict[scout_name]['dob'].split('/')]
-            dob_list[2] += 2000 + 18
-            age_out_date = datetime(dob_list[2], dob_list[0], dob_list[1])
-            eagle_impossible = age_out_date - timedelta(days=remain_rank_days)
-
-            # Add string to plot.
-            if current_rank == 'Life Scout':
-                eagle_str = 'Complete'
-                remain_rank_days = (age_out_date - datetime.now()).days
-            else:
-                eagle_str = 'Advance'
-            eagle_str += ' by {}, {} days remaining'.format(eagle_impossible.strftime('%Y_%m_%d'), remain_rank_days)
-            draw_image.text((col_offset, row_offset + index * line_pix), eagle_str, font=req_font, fill='red')
-
-        # Add color legend.
-        legend_x, legend_y = image_size[0] - 5 * margin_pix, image_size[1] - 3 * margin_pix
-        draw_image.rectangle((legend_x, legend_y, legend_x + 4 * margin_pix, legend_y + 2 * margin_pix), width=2, outline='black')
-        x_off, y_off = legend_x + 15, legend_y + 15
-        for row_off in range(4):
-            fill_color, outline_color, row_text = {
-                0: ('azure',         'black', 'Do at Meetings'),
-                1: ('cornsilk',      'black', 'Do as Homework'),
-                2: ('lavenderblush', 'black', 'Do on Outings'),
-                3: (None,            'red',   'Has Time Requirement')
-                }[row_off]
-            draw_image.rectangle((x_off, y_off, x_off + 20, y_off + 20), fill=fill_color, outline=outline_color)
-            draw_image.text((x_off + 30, y_off), row_text, font=rank_font, fill='black')
-            y_off += 25
-
-        # Save the image.
-        image_name = f'scout_advancement.png'
-        image.save(image_name, 'PNG')
-
-    def plot_trip_template(self):
-        '''Create trip checklist image.'''
+                # Save the image while the next page draws.
+                save_page(canvas, page_name)
+        return page_names
+
+    @PROFILER.timed('plot_trip_template')
+    def plot_trip_template(self, image_name='event_checklist.png', previous_state=None, event_name=None, scout_names=None):
+        '''Create trip checklist image, stamping names onto a cached blank grid and keeping pages of a previous render that would not change.'''
+        assert not event_name or len(event_name) <= type(self).event_name_len, \
+            f'[ERROR] Event name "{event_name}" is longer than {type(self).event_name_len} characters.'
 
         # Title text.
-        title_text = 'Troop Checklist - EVENT ____________________________   START _________  END _________   EST COST $_____   ACT COST $_____'
+        title_prefix = 'Troop Checklist - EVENT '
+        title_text = title_prefix + '_' * type(self).event_name_len + '   START _________  END _________   EST COST $_____   ACT COST $_____'
 
         # Headings.
         heading_list = (
@@ -482,105 +1850,498 @@ class PlotScoutAdvancement:
         line_pix = 50
         char_width = 13
         leader_count = 4
-
-        # Note blank lines added for leaders.
-        height = 4 * margin_pix + line_pix * (len(self.scout_order) + leader_count)
         width = 2 * margin_pix + max(sum([x * char_width for x in max_col_widths]), len(title_text) * (char_width + 3))
-        image_size = (width, height)
-
-        # Create the image.
-        image = Image.new('RGB', image_size, 'white')
-        draw_image = ImageDraw.Draw(image)
 
         # Set up fonts.
-        title_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Andale Mono.ttf', 24)
-        header_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Andale Mono.ttf', 16)
-        line_font = ImageFont.truetype('/System/Library/Fonts/Supplemental/Andale Mono.ttf', 20)
-
-        # Add the title.
-        draw_image.text((margin_pix, margin_pix // 2), title_text, font=title_font, fill='black')
-
-        # Add the header information.
-        col_offset = margin_pix
-        row_offset = 1.5 * margin_pix
-        for index, header_spec in enumerate(heading_list):
-            draw_image.text((col_offset, row_offset), header_spec[0], font=header_font, fill='black')
-            if len(header_spec) > 1:
-                draw_image.text((col_offset, row_offset + line_pix // 2), header_spec[1], font=header_font, fill='black')
-            col_offset += max_col_widths[index] * char_width
-
-        # Add the scout names.
-        col_offset = margin_pix
-        row_offset = 2 * 1.5 * margin_pix
-        for index, scout_name in enumerate(sorted(self.data_dict)):
-
-            # Obscure data.
-            if self.obscure_names:
-                scout_name = f'SCOUT NAME {index}'
-                scout_age = '##'
-
-            # Add scout name.
-            draw_image.text((col_offset, row_offset + index * line_pix), scout_name, font=line_font, fill='black')
-
-            # Add scout age.
-            scout_age = f'{self.data_dict[scout_name]["age"]}'
-            draw_image.text((col_offset + sum(max_col_widths[:7]) * char_width, row_offset + index * line_pix), scout_age, font=line_font, fill='black')
-
-
-        # Add some blank lines for leaders.
-        for index in range(leader_count):
-            draw_image.text((col_offset, row_offset + (index + len(self.scout_order)) * line_pix), '_' * max_col_widths[0], font=line_font, fill='black')
-        col_offset += max_col_widths[0] * char_width
-
-        # Add checkboxes and form lines
-        row_offset = 2 * 1.5 * margin_pix
-        for row_index in range(len(self.data_dict) + leader_count):
-            col_offset = margin_pix + max_col_widths[0] * char_width
-            for col_index, form_element in form_offsets:
-
-                # One checkbox.
-                if form_element == 'box':
-                    box_coords = [(col_offset + 2 * char_width, row_offset + row_index * line_pix)]
-                    box_coords.append((box_coords[0][0] + char_width, box_coords[0][1] + char_width))
-                    draw_image.rectangle(box_coords, outline='black')
-
-                # One checkbox.
-                elif form_element == 'boxes':
-                    for index in range(2):
-                        box_coords = [(col_offset + char_width // 2 + 3 * index * char_width, row_offset + row_index * line_pix)]
+        title_font = ('title', 24)
+        header_font = ('mono', 16)
+        line_font = ('mono', 20)
+
+        def plot_grid(image_size, page_rows):
+            '''Plot everything but the event, names and ages.'''
+            canvas = self.new_canvas(image_size)
+
+            # Add the title.
+            canvas.text((margin_pix, margin_pix // 2), title_text, title_font, 'black')
+
+            # Add the header information.
+            col_offset = margin_pix
+            row_offset = 1.5 * margin_pix
+            for index, header_spec in enumerate(heading_list):
+                canvas.text((col_offset, row_offset), header_spec[0], header_font, 'black')
+                if len(header_spec) > 1:
+                    canvas.text((col_offset, row_offset + line_pix // 2), header_spec[1], header_font, 'black')
+                col_offset += max_col_widths[index] * char_width
+
+            # Add blank lines for leaders.
+            row_offset = 2 * 1.5 * margin_pix
+            for index, scout_name in enumerate(page_rows):
+                if scout_name is None:
+                    canvas.text((margin_pix, row_offset + index * line_pix), '_' * max_col_widths[0], line_font, 'black')
+
+            # Add checkboxes and form lines
+            for row_index in range(len(page_rows)):
+                col_offset = margin_pix + max_col_widths[0] * char_width
+                for col_index, form_element in form_offsets:
+
+                    # One checkbox.
+                    if form_element == 'box':
+                        box_coords = [(col_offset + 2 * char_width, row_offset + row_index * line_pix)]
                         box_coords.append((box_coords[0][0] + char_width, box_coords[0][1] + char_width))
-                        draw_image.rectangle(box_coords, outline='black')
-
-                # Underline.
-                elif form_element == 'line':
-                    box_coords = [(col_offset, row_offset + row_index * line_pix + 2 * char_width)]
-                    box_coords.append((box_coords[0][0] + (max_col_widths[col_index] - 3) * char_width, box_coords[0][1]))
-                    draw_image.line(box_coords, fill='black')
-
-                # Go to the next column.
-                col_offset += max_col_widths[col_index] * char_width
-
-        # Save the image.
-        image_name = f'event_checklist.png'
-        image.save(image_name, 'PNG')
+                        canvas.rectangle(box_coords, outline='black')
+
+                    # One checkbox.
+                    elif form_element == 'boxes':
+                        for index in range(2):
+                            box_coords = [(col_offset + char_width // 2 + 3 * index * char_width, row_offset + row_index * line_pix)]
+                            box_coords.append((box_coords[0][0] + char_width, box_coords[0][1] + char_width))
+                            canvas.rectangle(box_coords, outline='black')
+
+                    # Underline.
+                    elif form_element == 'line':
+                        box_coords = [(col_offset, row_offset + row_index * line_pix + 2 * char_width)]
+                        box_coords.append((box_coords[0][0] + (max_col_widths[col_index] - 3) * char_width, box_coords[0][1]))
+                        canvas.line(box_coords, fill='black')
+
+                    # Go to the next column.
+                    col_offset += max_col_widths[col_index] * char_width
+            return canvas
+
+        # Rows are the scouts then blank lines for leaders, which go on the last page.
+        row_names = sorted(self.select_names(scout_names) if scout_names else self.data_dict) + [None] * leader_count
+        page_starts = self.page_starts(len(row_names) - leader_count)
+        page_names = self.page_names(image_name, len(page_starts))
+        page_ends = page_starts[1:] + [len(row_names)]
+        self.checklist_state = {'pages': dict()}
+        with RENDERER.pipeline() as save_page:
+            for page_index, (page_start, page_end, page_name) in enumerate(zip(page_starts, page_ends, page_names)):
+                page_rows = row_names[page_start:page_end]
+                height = 4 * margin_pix + line_pix * len(page_rows)
+                image_size = (width, height)
+
+                # Skip pages that would be drawn the same as before.
+                page_state = (image_size, self.obscure_names, self.palette, event_name, tuple((x, self.data_dict[x]['age']) if x else None for x in page_rows))
+                self.checklist_state['pages'][page_name] = page_state
+                if previous_state and previous_state['pages'].get(page_name) == page_state and os.path.isfile(page_name):
+                    PROFILER.count('pages.unchanged')
+                    continue
+
+                # Start from a copy of the blank grid, drawing it the first time this layout is used.
+                templates = type(self).checklist_templates
+                template_key = (self.backend, self.palette, image_size, tuple(max_col_widths), tuple(x is None for x in page_rows))
+                template = templates.pop(template_key, None) or plot_grid(image_size, page_rows)
+                templates[template_key] = template
+                while len(templates) > type(self).checklist_template_count:
+                    del templates[next(iter(templates))]
+                canvas = template.copy(self.png_options)
+
+                # Fill in the event on the title line.
+                if event_name:
+                    canvas.text((margin_pix + FONTS.font(*title_font).getlength(title_prefix), margin_pix // 2), event_name, title_font, 'black')
+
+                # Add the scout names.
+                col_offset = margin_pix
+                row_offset = 2 * 1.5 * margin_pix
+                for index, scout_name in enumerate(page_rows):
+                    if scout_name is None: continue
+
+                    # Obscure data.
+                    scout_age = f'{self.data_dict[scout_name]["age"]}'
+                    if self.obscure_names:
+                        scout_name = f'SCOUT NAME {page_start + index}'
+                        scout_age = '##'
+
+                    # Add scout name and age.
+                    canvas.text((col_offset, row_offset + index * line_pix), scout_name, line_font, 'black')
+                    canvas.text((col_offset + sum(max_col_widths[:7]) * char_width, row_offset + index * line_pix), scout_age, line_font, 'black')
+
+                # Save the image while the next page draws.
+                save_page(canvas, page_name)
+        return page_names
+
+    def select_names(self, scout_names):
+        '''Roster names matching the given names, ignoring case and extra spaces.'''
+        roster_names = {normalize_name(x): x for x in self.data_dict}
+        missing_names = [x for x in scout_names if normalize_name(x) not in roster_names]
+        assert not missing_names, \
+            f'[ERROR] Scouts not in "{self.csv_file}": {", ".join(missing_names)}.'
+        return list(dict.fromkeys(roster_names[normalize_name(x)] for x in scout_names))
+
+    def plot_event_checklists(self, events, output_dir='.'):
+        '''Checklists for many events from one roster, each a (name, scout names or None for everyone) pair.'''
+
+        # Check every event before drawing any, since names that differ only in punctuation would share a file.
+        event_slugs = [re.sub(r'[^a-z0-9]+', '_', x.lower()).strip('_') for x, _ in events]
+        for (event_name, _), event_slug in zip(events, event_slugs):
+            assert event_slug, \
+                f'[ERROR] Event name "{event_name}" needs a letter or digit for its file name.'
+            assert len(event_name) <= type(self).event_name_len, \
+                f'[ERROR] Event name "{event_name}" is longer than {type(self).event_name_len} characters.'
+        duplicate_names = [x for x, y in zip(events, event_slugs) if event_slugs.count(y) > 1]
+        assert not duplicate_names, \
+            f'[ERROR] Event names write the same file: {", ".join(x[0] for x in duplicate_names)}.'
+
+        # Draw each event's checklist.
+        output_files = list()
+        for (event_name, scout_names), event_slug in zip(events, event_slugs):
+            output_files += self.plot_trip_template(os.path.join(output_dir, f'event_checklist_{event_slug}.png'), event_name=event_name, scout_names=scout_names)
+        return output_files
+
+    def plot_checklists(self, output_dir='.', events=(), previous_state=None):
+        '''The checklist for everyone, updating a previous render, then one per event. The state kept is the main checklist's.'''
+        output_files = self.plot_trip_template(os.path.join(output_dir, 'event_checklist.png'), previous_state)
+        checklist_state = self.checklist_state
+        output_files += self.plot_event_checklists(events, output_dir)
+        self.checklist_state = checklist_state
+        return output_files
+
+    def render(self, actions=('chart', 'checklist'), output_dir='.', events=(), previous=None):
+        '''Draw the chart and the checklists at the same time, updating a previous render's images, and return the files written.'''
+        tasks = list()
+        if 'chart' in actions:
+            advancement_state = previous.advancement_state if previous else None
+            tasks.append(lambda: self.plot_advancement(os.path.join(output_dir, 'scout_advancement.png'), advancement_state))
+        if 'checklist' in actions:
+            checklist_state = previous.checklist_state if previous else None
+            tasks.append(lambda: self.plot_checklists(output_dir, events, checklist_state))
+        return [x for task_files in RENDERER.run(tasks) for x in task_files]
+
+def find_reports(batch_spec):
+    '''Expand a directory or glob into a sorted list of CSV files.'''
+    if os.path.isdir(batch_spec):
+        batch_spec = os.path.join(batch_spec, '*.csv')
+    return sorted(x for x in glob.glob(batch_spec) if os.path.isfile(x))
+
+def report_name(csv_file):
+    '''Output directory name for a report, the file name without its extension.'''
+    return os.path.splitext(os.path.basename(csv_file))[0]
+
+def write_report_files(plot_scout_advancement, report_dir, dump=False, export_format=None):
+    '''Write the text dump and the per scout records into a report's directory, returning the files written.'''
+    output_files = list()
+
+    # Dump to a text file since workers share the terminal.
+    if dump:
+        output_files.append(os.path.join(report_dir, 'advancement_dump.txt'))
+        with open(output_files[-1], 'w') as dF, contextlib.redirect_stdout(dF):
+            plot_scout_advancement.dump_data()
+    if export_format:
+        output_files.append(os.path.join(report_dir, f'advancement.{export_format}'))
+        plot_scout_advancement.export_records(output_files[-1], export_format)
+    return output_files
+
+def process_report(csv_file, output_dir, obscure_names, dump=False, cache_dir=None, cache_bytes=None, font_paths=(), render_options=None, profile=False, scouts=None, history_file=None, export_format=None, events=(), actions=('chart', 'checklist')):
+    '''Parse one report and render its charts into a directory named after the file.'''
+    FONTS.add_search_paths(font_paths)
+    if profile:
+        PROFILER.enable(memory=profile == 'memory')
+        PROFILER.reset()
+
+    # Outputs go in a directory named for the report so they are deterministic per input.
+    report_dir = os.path.join(output_dir, report_name(csv_file))
+    os.makedirs(report_dir, exist_ok=True)
+
+    # Parse and render.
+    cache = None if cache_bytes is None else SnapshotCache(cache_dir, cache_bytes)
+    plot_scout_advancement = PlotScoutAdvancement(csv_file, obscure_names, scouts=scouts, **(render_options or dict()))
+    plot_scout_advancement.read_data(cache)
+    output_files = plot_scout_advancement.render(actions, report_dir, events)
+
+    # Add to the history database.
+    if history_file:
+        history = AdvancementHistory(history_file)
+        history.ingest(plot_scout_advancement)
+        history.close()
+
+    # Text and record files.
+    output_files += write_report_files(plot_scout_advancement, report_dir, dump, export_format)
+
+    # Profile each report on its own.
+    if profile:
+        output_files.append(os.path.join(report_dir, 'profile.json'))
+        PROFILER.write(output_files[-1], {'file': csv_file})
+    return output_files
+
+def process_batch(csv_files, output_dir, obscure_names, dump=False, cache_dir=None, cache_bytes=None, font_paths=(), render_options=None, profile=False, scouts=None, history_file=None, export_format=None, events=(), actions=('chart', 'checklist'), jobs=None):
+    '''Process many reports across a pool of worker processes.'''
+
+    # Each report renders into a directory named for its file, so files in different folders can't share a name.
+    name_counts = Counter(report_name(x) for x in csv_files)
+    duplicate_files = [x for x in csv_files if name_counts[report_name(x)] > 1]
+    assert not duplicate_files, \
+        f'[ERROR] Reports with the same file name would write the same output directory: {", ".join(duplicate_files)}.'
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(process_report, x, output_dir, obscure_names, dump, cache_dir, cache_bytes, font_paths, render_options, profile, scouts, history_file, export_format, events, actions) for x in csv_files]
+        for csv_file, future in zip(csv_files, futures):
+            try:
+                print(f'{csv_file}: ' + ', '.join(future.result()))
+            except Exception as error:
+                print(f'[ERROR] {csv_file}: {error}')
+                failures += 1
+    return failures
+
+def watch_name(csv_file):
+    '''Report name without the export date, so each new export updates the same charts.'''
+    return re.sub(r'_?\d{8}$', '', os.path.splitext(os.path.basename(csv_file))[0])
+
+def watch_report(csv_file, output_dir, obscure_names, previous=None, dump=False, cache=None, render_options=None, scouts=None, history=None, actions=('chart', 'checklist'), events=(), export_format=None):
+    '''Parse an export and update its charts, redrawing only what changed since the previous parse.'''
+    report_dir = os.path.join(output_dir, watch_name(csv_file))
+    os.makedirs(report_dir, exist_ok=True)
+
+    # Parse and compare with the previous export.
+    plot_scout_advancement = PlotScoutAdvancement(csv_file, obscure_names, scouts=scouts, **(render_options or dict()))
+    plot_scout_advancement.read_data(cache)
+    changed = plot_scout_advancement.changed_scouts(previous) if previous else list(plot_scout_advancement.scout_names)
+    if history: history.ingest(plot_scout_advancement)
+
+    # Update the charts on top of the previous images.
+    output_files = plot_scout_advancement.render(actions, report_dir, events, previous)
+    output_files += write_report_files(plot_scout_advancement, report_dir, dump, export_format)
+    return plot_scout_advancement, changed, output_files
+
+def watch_reports(watch_spec, output_dir, obscure_names, interval=5.0, dump=False, cache_dir=None, cache_bytes=None, font_paths=(), render_options=None, scouts=None, history_file=None, actions=('chart', 'checklist'), events=(), export_format=None, max_polls=None):
+    '''Poll a directory or glob for new or changed exports and update their charts.'''
+    FONTS.add_search_paths(font_paths)
+    cache = None if cache_bytes is None else SnapshotCache(cache_dir, cache_bytes)
+    history = AdvancementHistory(history_file) if history_file else None
+    file_stats = dict()
+    processed = dict()
+    previous = dict()
+    polls = 0
+    while True:
+
+        # Take the newest export of each report once it has stopped changing between polls.
+        latest_files = {watch_name(x): x for x in find_reports(watch_spec)}
+        for report_name, csv_file in sorted(latest_files.items()):
+            try:
+                file_stat = os.stat(csv_file)
+            except OSError:
+                continue
+            stat_key = (csv_file, file_stat.st_size, file_stat.st_mtime_ns)
+            settled = file_stats.get(report_name) == stat_key
+            file_stats[report_name] = stat_key
+            if not settled or processed.get(report_name) == stat_key: continue
+            processed[report_name] = stat_key
+
+            # Update the charts, keeping the parse to compare with the next export.
+            try:
+                previous[report_name], changed, output_files = watch_report(csv_file, output_dir, obscure_names, previous.get(report_name), dump, cache, render_options, scouts, history, actions, events, export_format)
+                print(f'{csv_file}: {len(changed)} scouts changed: ' + ', '.join(output_files), flush=True)
+            except Exception as error:
+                print(f'[ERROR] {csv_file}: {error}', flush=True)
+
+        # Wait for the next poll.
+        polls += 1
+        if max_polls and polls >= max_polls: break
+        time.sleep(interval)
+
+def animate_reports(csv_files, image_name, obscure_names, frame_ms=1000, cache_dir=None, cache_bytes=None, font_paths=(), render_options=None, scouts=None):
+    '''Animate the advancement chart over a unit's exports as a GIF or APNG, drawing each frame as the changed rows of the one before.'''
+    FONTS.add_search_paths(font_paths)
+    cache = None if cache_bytes is None else SnapshotCache(cache_dir, cache_bytes)
+
+    # Frames are one page, and GIF frames use the chart palette.
+    gif = image_name.lower().endswith('.gif')
+    render_options = {**(render_options or dict()), 'page_size': None, 'output_format': 'png'}
+    if gif: render_options['palette'] = True
+
+    # Parse the exports, oldest first.
+    snapshots = sorted((PlotScoutAdvancement(x, obscure_names, **render_options) for x in csv_files), key=lambda x: x.report_date)
+    for plot_scout_advancement in snapshots:
+        plot_scout_advancement.read_data(cache)
+
+    # Scouts keep one row throughout: the latest chart order, then those who left, most recent first.
+    row_keys = list(dict.fromkeys(normalize_name(x) for y in reversed(snapshots) for x in y.scout_order))
+    if scouts:
+        selected = {normalize_name(x) for x in scouts}
+        missing_names = [x for x in scouts if normalize_name(x) not in row_keys]
+        assert not missing_names, \
+            f'[ERROR] Scouts not in any export: {", ".join(missing_names)}.'
+        row_keys = [x for x in row_keys if x in selected]
+    name_len = max(len(x) for y in snapshots for x in y.data_dict)
+
+    # Draw each frame on a copy of the last, blank rows for scouts not in that export.
+    frames = list()
+    previous = None
+    try:
+        for plot_scout_advancement in snapshots:
+            plot_scout_advancement.backend = FrameBackend
+            plot_scout_advancement.max_name_len = name_len
+            roster = {normalize_name(x): x for x in plot_scout_advancement.data_dict}
+            row_names = [roster.get(x) for x in row_keys]
+            page_name = plot_scout_advancement.plot_advancement(image_name, previous.advancement_state if previous else None, row_names)[0]
+            frames.append(FrameBackend.frames[page_name])
+            changed = plot_scout_advancement.changed_scouts(previous) if previous else plot_scout_advancement.scout_names
+            print(f'{plot_scout_advancement.csv_file}: {len(changed)} scouts changed', flush=True)
+            previous = plot_scout_advancement
+    finally:
+        FrameBackend.frames.clear()
+
+    # Pad frames to the largest, since new requirement versions can widen the chart, and write the animation.
+    frame_size = (max(x.size[0] for x in frames), max(x.size[1] for x in frames))
+    for index, frame in enumerate(frames):
+        if frame.size != frame_size:
+            frames[index] = new_image(frame_size, frame.mode == 'P')
+            frames[index].paste(frame, (0, 0))
+    save_options = dict() if gif else snapshots[0].png_options
+    frames[0].save(image_name, 'GIF' if gif else 'PNG', save_all=True, append_images=frames[1:], duration=frame_ms, loop=0, **save_options)
+    return image_name
+
+def print_history(history_file, history_report):
+    '''Print requirements completed per month or the days between ranks from the history database.'''
+    history = AdvancementHistory(history_file)
+    if history_report == 'months':
+        for month, completed in history.completed_per_month():
+            print(f'{month}  {completed:5d}')
+    else:
+        rank_len = max(len(x) for x in PlotScoutAdvancement.rank_progression)
+        for scout_rank, scout_count, average_days, max_days in history.rank_interval_summary():
+            print(f'{scout_rank:<{rank_len}s}  {scout_count:4d} scouts  {average_days:7.1f} days average  {max_days:6.0f} days longest')
+    history.close()
+
+# What each subcommand renders.
+COMMAND_ACTIONS = {
+    'dump':      (),
+    'chart':     ('chart',),
+    'checklist': ('checklist',),
+    'all':       ('chart', 'checklist'),
+    }
 
 def main(sysargs):
     '''For command line running and testing.'''
 
-    # Create the argument parser.
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--file', required=True)
-    parser.add_argument('--dump', action='store_true')
-    parser.add_argument('--plot', action='store_true')
-    parser.add_argument('--obscure', action='store_true')
+    # Options shared by the subcommands.
+    common = argparse.ArgumentParser(add_help=False)
+    input_group = common.add_mutually_exclusive_group()
+    input_group.add_argument('--file')
+    input_group.add_argument('--batch', help='directory or glob of CSV files to process in parallel')
+    input_group.add_argument('--watch', help='directory or glob to poll for new exports, updating only what changed')
+    common.add_argument('--interval', type=float, default=5.0, help='seconds between watch polls')
+    common.add_argument('--output-dir', default='batch_output', help='batch output directory, one subdirectory per file')
+    common.add_argument('--jobs', type=int, help='number of batch worker processes (default is the CPU count)')
+    common.add_argument('--dump', action='store_true')
+    common.add_argument('--plot', action='store_true')
+    common.add_argument('--obscure', action='store_true')
+    common.add_argument('--cache-dir', help='parsed snapshot cache directory')
+    common.add_argument('--cache-size', type=int, default=256, help='snapshot cache size cap in MB')
+    common.add_argument('--no-cache', action='store_true', help='always parse the CSV file')
+    common.add_argument('--font-path', action='append', default=list(), help='directory to search for fonts (repeatable)')
+    common.add_argument('--palette', action='store_true', help='render indexed color images')
+    common.add_argument('--png-compress-level', type=int, choices=range(10), default=6, help='zlib level for PNG output')
+    common.add_argument('--png-optimize', action='store_true', help='extra PNG size optimization (slower)')
+    common.add_argument('--page-size', type=int, help='scouts per page, writing numbered images')
+    common.add_argument('--format', choices=sorted(BACKENDS), default='png', help='raster PNG or vector SVG output')
+    common.add_argument('--profile', nargs='?', const='-', help='write per-phase timings and counters as JSON (stdout by default)')
+    common.add_argument('--profile-memory', action='store_true', help='add per-phase peak traced memory to --profile (slows the timed phases)')
+    common.add_argument('--cprofile', help='write cProfile statistics to this file')
+    common.add_argument('--scouts', help='comma separated scout names to read, skipping everyone else')
+    common.add_argument('--patrol', help='file of scout names to read, one per line')
+    common.add_argument('--query', help='print scouts still needing "<rank> [<requirement>]" instead of plotting')
+    common.add_argument('--where', help='limit --query or --plan to requirements done at "meetings", as "homework" or on "outings"')
+    common.add_argument('--plan', type=int, help='print this many meeting and outing topics that cover the most scouts instead of plotting')
+    common.add_argument('--export', help='stream one record per scout to this file, or - for stdout (batch and watch write one per report)')
+    common.add_argument('--export-format', choices=('jsonl', 'csv'), help='export format (default from the --export extension, otherwise JSON lines)')
+    common.add_argument('--event', action='append', default=list(), help='also write a checklist for "NAME" (up to 28 characters) or "NAME=PATROL_FILE" (repeatable)')
+    common.add_argument('--history', help='SQLite database each parsed export is added to')
+    common.add_argument('--history-report', choices=('months', 'ranks'), help='print requirements completed per month or days between ranks from --history')
+
+    # Create the argument parser. Options without a subcommand run everything, as before subcommands.
+    parser = argparse.ArgumentParser(description='Chart, checklist and text reports from ScoutBook Report Builder exports.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('dump', parents=[common], help='parse only and print the text dump, or --export/--query/--plan, without loading PIL')
+    subparsers.add_parser('chart', parents=[common], help='render the advancement chart')
+    subparsers.add_parser('checklist', parents=[common], help='render the event checklist and any --event checklists')
+    subparsers.add_parser('all', parents=[common], help='render everything (the default)')
+    animate_parser = subparsers.add_parser('animate', parents=[common], help='animate the advancement chart over the --batch exports for one unit')
+    animate_parser.add_argument('--animation', default='scout_advancement.gif', help='GIF, or APNG for a .png name')
+    animate_parser.add_argument('--frame-ms', type=int, default=1000, help='milliseconds per export')
+    if not sysargs or (sysargs[0].startswith('-') and sysargs[0] not in ('-h', '--help')): sysargs = ['all'] + list(sysargs)
     args = parser.parse_args(sysargs)
+    if not (args.file or args.batch or args.watch or args.history_report):
+        parser.error('one of the arguments --file --batch --watch is required')
+    if args.history_report and not args.history:
+        parser.error('--history-report needs --history')
+    if args.profile_memory and not args.profile:
+        parser.error('--profile-memory needs --profile')
+    if args.command == 'animate' and not args.batch:
+        parser.error('animate needs --batch')
+    actions = COMMAND_ACTIONS.get(args.command, ())
+    events = parse_events(args.event)
+    export_format = args.export_format or (('csv' if args.export.endswith('.csv') else 'jsonl') if args.export else None)
+    FONTS.add_search_paths(args.font_path)
+    png_options = dict(compress_level=args.png_compress_level, optimize=args.png_optimize)
+    render_options = dict(palette=args.palette, png_options=png_options, page_size=args.page_size, output_format=args.format)
+
+    # The dump subcommand prints the text dump unless it was asked for data instead.
+    dump = args.dump or (args.command == 'dump' and not (args.export or args.query or args.where or args.plan or args.history))
+
+    # Selected scouts from the list and the patrol file.
+    scouts = [x.strip() for x in args.scouts.split(',') if x.strip()] if args.scouts else list()
+    if args.patrol: scouts += read_patrol(args.patrol)
+
+    # Animate a directory or glob of files.
+    cache_bytes = None if args.no_cache else args.cache_size * 1024 * 1024
+    if args.command == 'animate':
+        csv_files = find_reports(args.batch)
+        assert csv_files, \
+            f'[ERROR] No CSV files match "{args.batch}".'
+        if args.profile: PROFILER.enable(args.profile_memory)
+        animate_reports(csv_files, args.animation, args.obscure, args.frame_ms, args.cache_dir, cache_bytes, args.font_path, render_options, scouts)
+        if args.profile: PROFILER.write(args.profile, {'batch': args.batch})
+        return
+
+    # Process a directory or glob of files.
+    if args.batch:
+        csv_files = find_reports(args.batch)
+        assert csv_files, \
+            f'[ERROR] No CSV files match "{args.batch}".'
+        failures = process_batch(csv_files, args.output_dir, args.obscure, dump, args.cache_dir, cache_bytes, args.font_path, render_options, 'memory' if args.profile_memory else bool(args.profile), scouts, args.history, export_format, events, actions, args.jobs)
+        if args.history_report: print_history(args.history, args.history_report)
+        sys.exit(1 if failures else 0)
+
+    # Poll for exports until interrupted.
+    if args.watch:
+        try:
+            watch_reports(args.watch, args.output_dir, args.obscure, args.interval, dump, args.cache_dir, cache_bytes, args.font_path, render_options, scouts, args.history, actions, events, export_format)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Only report on the history.
+    if not args.file:
+        print_history(args.history, args.history_report)
+        return
+
+    # Start profiling.
+    if args.profile: PROFILER.enable(args.profile_memory)
+    c_profile = cProfile.Profile() if args.cprofile else None
+    if c_profile: c_profile.enable()
 
     # Instance class and create plots.
-    plot_scout_advancement = PlotScoutAdvancement(args.file, args.obscure)
-    plot_scout_advancement.read_data()
-    plot_scout_advancement.plot_advancement()
-    plot_scout_advancement.plot_trip_template()
-    if args.dump: plot_scout_advancement.dump_data()
+    cache = None if cache_bytes is None else SnapshotCache(args.cache_dir, cache_bytes)
+    plot_scout_advancement = PlotScoutAdvancement(args.file, args.obscure, scouts=scouts, **render_options)
+    plot_scout_advancement.read_data(cache)
+    if args.plan:
+        plot_scout_advancement.plan_topics(args.plan, args.where)
+    elif args.query or args.where:
+        plot_scout_advancement.print_query(args.query, args.where)
+    else:
+        plot_scout_advancement.render(actions, events=events)
+    if dump: plot_scout_advancement.dump_data()
+    if args.export: plot_scout_advancement.export_records(args.export, export_format)
+    if args.history:
+        history = AdvancementHistory(args.history)
+        history.ingest(plot_scout_advancement)
+        history.close()
+        if args.history_report: print_history(args.history, args.history_report)
+
+    # Write the profiles.
+    if c_profile:
+        c_profile.disable()
+        c_profile.dump_stats(args.cprofile)
+    if args.profile: PROFILER.write(args.profile, {'file': args.file})
 
 if __name__ == '__main__':
     main(sys.argv[1:])